@@ -15,8 +15,8 @@ def create_app():
         r"/*": {
             "origins": app.config['ALLOWED_ORIGINS'],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "X-Refresh-Token"],
-            "expose_headers": ["Content-Type", "Authorization", "X-Refresh-Token"]
+            "allow_headers": ["Content-Type", "Authorization", "X-Refresh-Token", "If-Match", "If-None-Match", "Idempotency-Key"],
+            "expose_headers": ["Content-Type", "Authorization", "X-Refresh-Token", "X-Next-Cursor", "ETag", "Idempotent-Replayed"]
         }
     })
     
@@ -42,4 +42,25 @@ def create_app():
     app.register_blueprint(users_bp)
     
     logger.info("All blueprints registered successfully")
+    
+    # Share cache invalidations with the other workers
+    if app.config['INVALIDATION_BUS_ENABLED']:
+        from utils.invalidation import invalidation_bus
+        invalidation_bus.start()
+    
+    # Index ticket changes in the background
+    if app.config['VECTOR_OUTBOX_ENABLED']:
+        from utils.vector_outbox import outbox_worker
+        outbox_worker.start()
+    
+    # Move long-closed tickets to the archive
+    if app.config['ARCHIVE_ENABLED']:
+        from utils.ticket_archiver import ticket_archiver
+        ticket_archiver.start()
+    
+    # Prune the tables that only grow
+    if app.config['MAINTENANCE_ENABLED']:
+        from utils.maintenance import maintenance_worker
+        maintenance_worker.start()
+    
     return app 
\ No newline at end of file
@@ -14,6 +14,8 @@ class Config:
     # Load configuration from environment variables
     SUPABASE_URL = os.getenv('SUPABASE_URL')
     SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
+    SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
+    SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
     IS_LOCAL = os.getenv('IS_LOCAL', 'false').lower() == 'true'
     
     if IS_LOCAL:
@@ -28,9 +30,81 @@ class Config:
             
         SUPABASE_URL = local_url
         SUPABASE_ANON_KEY = os.getenv('SUPABASE_LOCAL_ANON_KEY', SUPABASE_ANON_KEY)
+        SUPABASE_JWT_SECRET = os.getenv('SUPABASE_LOCAL_JWT_SECRET', SUPABASE_JWT_SECRET)
+        SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_LOCAL_SERVICE_KEY', SUPABASE_SERVICE_KEY)
         logger.info(f"Using local Supabase URL: {SUPABASE_URL}")
         logger.info(f"Local anon key set: {bool(SUPABASE_ANON_KEY)}")
     
+    # JWT verification settings
+    JWT_AUDIENCE = os.getenv('JWT_AUDIENCE', 'authenticated')
+    # Tokens expiring within this many seconds are re-validated with the auth server
+    JWT_REFRESH_MARGIN = int(os.getenv('JWT_REFRESH_MARGIN', '60'))
+    JWKS_CACHE_TTL = int(os.getenv('JWKS_CACHE_TTL', '600'))
+    
+    # Connection pool shared by the per-request PostgREST clients
+    SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv('SUPABASE_POOL_MAX_CONNECTIONS', '100'))
+    SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv('SUPABASE_POOL_MAX_KEEPALIVE', '20'))
+    
+    # Profile cache settings
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', '4096'))
+    PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', '60'))
+    
+    # Ticket read cache; lists are cached briefly since any write can change them
+    TICKET_CACHE_SIZE = int(os.getenv('TICKET_CACHE_SIZE', '10000'))
+    TICKET_CACHE_TTL = int(os.getenv('TICKET_CACHE_TTL', '300'))
+    TICKET_LIST_CACHE_SIZE = int(os.getenv('TICKET_LIST_CACHE_SIZE', '1000'))
+    TICKET_LIST_CACHE_TTL = int(os.getenv('TICKET_LIST_CACHE_TTL', '30'))
+    
+    # In-memory autocomplete indexes, one per ticket list scope. Each is
+    # rebuilt in the background after the TTL, which bounds staleness for
+    # changes made outside the app, and holds the newest SUGGEST_MAX_TICKETS.
+    SUGGEST_SCOPE_COUNT = int(os.getenv('SUGGEST_SCOPE_COUNT', '200'))
+    SUGGEST_SCOPE_TTL = int(os.getenv('SUGGEST_SCOPE_TTL', '900'))
+    SUGGEST_MAX_TICKETS = int(os.getenv('SUGGEST_MAX_TICKETS', '20000'))
+    SUGGEST_RECENT_QUERIES = int(os.getenv('SUGGEST_RECENT_QUERIES', '200'))
+    
+    # Workers on this host broadcast cache invalidations through sockets in this directory
+    INVALIDATION_BUS_ENABLED = os.getenv('INVALIDATION_BUS_ENABLED', 'true').lower() == 'true'
+    INVALIDATION_SOCKET_DIR = os.getenv('INVALIDATION_SOCKET_DIR', '/tmp/breeze-invalidation')
+    # How long a send waits for a busy worker to drain its socket before dropping the message
+    INVALIDATION_SEND_TIMEOUT = float(os.getenv('INVALIDATION_SEND_TIMEOUT', '0.1'))
+    
+    # Server-sent ticket change feed. Streams hold a worker thread, so they
+    # are capped per worker and closed periodically for clients to reconnect.
+    TICKET_STREAM_MAX_CLIENTS = int(os.getenv('TICKET_STREAM_MAX_CLIENTS', '4'))
+    TICKET_STREAM_MAX_SECONDS = int(os.getenv('TICKET_STREAM_MAX_SECONDS', '300'))
+    TICKET_STREAM_HEARTBEAT = int(os.getenv('TICKET_STREAM_HEARTBEAT', '15'))
+    
+    # Background vector indexing; the worker drains the outbox with the service key
+    VECTOR_OUTBOX_ENABLED = os.getenv('VECTOR_OUTBOX_ENABLED', 'true').lower() == 'true'
+    VECTOR_OUTBOX_BATCH_SIZE = int(os.getenv('VECTOR_OUTBOX_BATCH_SIZE', '200'))
+    VECTOR_OUTBOX_POLL_INTERVAL = float(os.getenv('VECTOR_OUTBOX_POLL_INTERVAL', '2'))
+    VECTOR_OUTBOX_LEASE_SECONDS = int(os.getenv('VECTOR_OUTBOX_LEASE_SECONDS', '120'))
+    VECTOR_OUTBOX_MAX_RETRY_DELAY = int(os.getenv('VECTOR_OUTBOX_MAX_RETRY_DELAY', '900'))
+    
+    # How long responses to requests with an Idempotency-Key are replayed
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '4096'))
+    # A request still running after this long is presumed dead and its key can be retried
+    IDEMPOTENCY_LEASE = int(os.getenv('IDEMPOTENCY_LEASE', '300'))
+    
+    # Rows inserted per round trip by the bulk ticket import
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))
+    
+    # Closed tickets move to the archive tables after ARCHIVE_AFTER_DAYS. Their
+    # vectors are moved to the archive namespace, deleted or kept (move/delete/keep).
+    ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'true').lower() == 'true'
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+    ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', '3600'))
+    ARCHIVE_VECTOR_POLICY = os.getenv('ARCHIVE_VECTOR_POLICY', 'move')
+    
+    # Periodic pruning of tables that only grow: the ticket change feed log
+    # and expired idempotency keys
+    MAINTENANCE_ENABLED = os.getenv('MAINTENANCE_ENABLED', 'true').lower() == 'true'
+    MAINTENANCE_INTERVAL = int(os.getenv('MAINTENANCE_INTERVAL', '3600'))
+    TICKET_EVENTS_RETENTION_DAYS = int(os.getenv('TICKET_EVENTS_RETENTION_DAYS', '7'))
+    
     # CORS settings
     ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
     
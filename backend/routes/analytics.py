@@ -1,20 +1,15 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from config import supabase_client, logger
+from config import logger
 from .auth import requires_agent, requires_auth, get_user_from_token
 import traceback
+from utils.supabase_pool import get_request_client
+from utils.etag import (
+    get_collection_version, make_collection_etag, is_not_modified, not_modified_response, with_etag
+)
 
 analytics_bp = Blueprint('analytics', __name__)
 
-def get_supabase_client(token, refresh_token):
-    try:
-        # Set the session
-        session = supabase_client.auth.set_session(token, refresh_token)
-        return supabase_client, session.user
-    except Exception as e:
-        logger.error(f"Error setting session: {str(e)}")
-        return None, None
-
 @analytics_bp.route('/analytics/widgets', methods=['GET'])
 @requires_auth
 def get_widgets():
@@ -29,27 +24,34 @@ def get_widgets():
             logger.error("Missing authorization tokens")
             return jsonify({'error': 'No authorization tokens provided'}), 401
 
-        # Get Supabase client with session
-        client, user = get_supabase_client(token, refresh_token)
-        if not client or not user:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
+        # Get Supabase client for the caller
+        client = get_request_client()
+        user = get_user_from_token(request)
 
-        logger.info(f"User ID: {user.id}")
+        logger.info(f"User ID: {user['id']}")
+        
+        # Widgets have a change counter per user
+        etag = make_collection_etag(
+            get_collection_version(client, f"dashboard_widgets:{user['id']}"),
+            user['id']
+        )
+        if is_not_modified(etag):
+            return not_modified_response(etag)
         
         # Query widgets based on user's ID
-        logger.info(f"Querying widgets for user ID: {user.id}")
+        logger.info(f"Querying widgets for user ID: {user['id']}")
         result = (
             client
             .table('dashboard_widgets')
             .select('*')
-            .eq('user_id', user.id)
+            .eq('user_id', user['id'])
             .execute()
         )
         
         logger.info(f"Query result: {result}")
         widgets = result.data if hasattr(result, 'data') and result.data else []
         logger.info(f"Returning {len(widgets)} widgets")
-        return jsonify(widgets), 200
+        return with_etag(jsonify(widgets), etag), 200
 
     except Exception as e:
         logger.error(f"Failed to get widgets: {str(e)}")
@@ -70,12 +72,11 @@ def save_widgets():
             logger.error("Missing authorization tokens")
             return jsonify({'error': 'No authorization tokens provided'}), 401
 
-        # Get Supabase client with session
-        client, user = get_supabase_client(token, refresh_token)
-        if not client or not user:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
+        # Get Supabase client for the caller
+        client = get_request_client()
+        user = get_user_from_token(request)
 
-        logger.info(f"User ID: {user.id}")
+        logger.info(f"User ID: {user['id']}")
         
         data = request.get_json()
         if not data or not isinstance(data, list):
@@ -85,12 +86,12 @@ def save_widgets():
         logger.info(f"Received {len(data)} widgets to save")
 
         # Delete existing widgets for this user
-        logger.info(f"Deleting existing widgets for user ID: {user.id}")
+        logger.info(f"Deleting existing widgets for user ID: {user['id']}")
         delete_result = (
             client
             .table('dashboard_widgets')
             .delete()
-            .eq('user_id', user.id)
+            .eq('user_id', user['id'])
             .execute()
         )
         logger.info(f"Delete result: {delete_result}")
@@ -98,7 +99,7 @@ def save_widgets():
         # Insert new widgets
         logger.info("Preparing widget data for insertion...")
         widget_data = [{
-            'user_id': user.id,
+            'user_id': user['id'],
             'widget_data': widget,
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat()
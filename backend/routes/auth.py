@@ -1,11 +1,24 @@
-from flask import Blueprint, request, jsonify
-from config import supabase_client, logger
+from flask import Blueprint, request, jsonify, g
+from config import Config, supabase_client, logger
 import traceback
+import threading
 from functools import wraps
 from postgrest import APIError
+import jwt
+from utils.jwt_utils import token_verifier
+from utils.cache import TTLCache
+from utils.supabase_pool import client_pool
+from utils.invalidation import invalidation_bus
 
 auth_bp = Blueprint('auth', __name__)
 
+# Profiles keyed by user ID, shared across requests in this worker
+profile_cache = TTLCache(maxsize=Config.PROFILE_CACHE_SIZE, ttl=Config.PROFILE_CACHE_TTL)
+invalidation_bus.subscribe('profiles', lambda message: profile_cache.delete(message['user_id']))
+
+# The shared auth client holds a single session, so fallbacks to it are serialized
+auth_fallback_lock = threading.Lock()
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -65,6 +78,7 @@ def register():
                 
             # Log successful user creation
             logger.info(f"User registered successfully with ID: {auth_response.user.id}")
+            invalidate_profile(auth_response.user.id)
             logger.info(f"User metadata: {auth_response.user.user_metadata}")
             
             # Check if session was created
@@ -137,7 +151,8 @@ def login():
                 return jsonify({'error': 'Login failed'}), 401
             
             # Get user profile from the profiles table
-            profile_response = supabase_client.table('profiles').select('*').eq('id', auth_response.user.id).execute()
+            client = client_pool.get_client(auth_response.session.access_token)
+            profile_response = client.table('profiles').select('*').eq('id', auth_response.user.id).execute()
             
             if not profile_response.data:
                 logger.error(f"No profile found for user {auth_response.user.id}")
@@ -145,6 +160,9 @@ def login():
             
             profile = profile_response.data[0]
             
+            # Signing in reads the profile anyway; refresh the cache in every worker
+            cache_profile(auth_response.user.id, {'email': profile['email'], 'role': profile['role']})
+            
             return jsonify({
                 'access_token': auth_response.session.access_token,
                 'refresh_token': auth_response.session.refresh_token,
@@ -164,7 +182,50 @@ def login():
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 401
 
+def invalidate_profile(user_id):
+    """Drop a cached profile in every worker, e.g. after the user's role has changed"""
+    profile_cache.delete(user_id)
+    invalidation_bus.publish('profiles', {'user_id': user_id})
+
+def cache_profile(user_id, profile, claimed_role=None):
+    """
+    Cache a freshly read profile, telling other workers if it changed
+
+    claimed_role is the token role the profile was checked against; tokens
+    keep their role after it changes, so a token that disagrees is only
+    re-checked once, not on every request.
+    """
+    cached = profile_cache.get(user_id)
+    profile_cache.set(user_id, {**profile, 'checked_claim': claimed_role})
+    if cached is not None and (cached['email'], cached['role']) != (profile['email'], profile['role']):
+        # Other workers may still hold the old profile
+        invalidation_bus.publish('profiles', {'user_id': user_id})
+
+def get_profile(user_id, access_token, claimed_role=None):
+    cached = profile_cache.get(user_id)
+    # A role in the token that disagrees with the cached profile may mean the role changed
+    if cached is not None and claimed_role in (None, cached['role'], cached['checked_claim']):
+        return {'email': cached['email'], 'role': cached['role']}
+    
+    # Profiles are protected by RLS, so query as the caller
+    client = client_pool.get_client(access_token)
+    profile_response = client.table('profiles').select('email, role').eq('id', user_id).execute()
+    
+    if not profile_response.data:
+        raise Exception('User profile not found')
+    
+    profile = {
+        'email': profile_response.data[0]['email'],
+        'role': profile_response.data[0]['role']
+    }
+    cache_profile(user_id, profile, claimed_role if claimed_role != profile['role'] else None)
+    return profile
+
 def get_user_from_token(request):
+    # Resolve the user once per request; handlers reuse what the decorators stored
+    if 'current_user' in g:
+        return g.current_user
+    
     auth_header = request.headers.get('Authorization')
     refresh_token = request.headers.get('X-Refresh-Token')
     
@@ -180,25 +241,38 @@ def get_user_from_token(request):
     token = auth_header.replace('Bearer ', '')
     
     try:
-        # Set up the Supabase session with both tokens
-        session = supabase_client.auth.set_session(token, refresh_token)
-        
-        if not session.user:
-            raise Exception('Invalid session')
-        
-        # Get user profile from the profiles table
-        profile_response = supabase_client.table('profiles').select('*').eq('id', session.user.id).execute()
+        claims = None
+        try:
+            # Verify the token locally to avoid an auth server round trip
+            claims = token_verifier.verify(token)
+        except jwt.PyJWTError as verify_error:
+            logger.debug(f"Local token verification failed, falling back to auth server: {str(verify_error)}")
         
-        if not profile_response.data:
-            raise Exception('User profile not found')
+        if claims is None or token_verifier.is_near_expiry(claims):
+            # Let Supabase validate (and refresh if needed) the session
+            with auth_fallback_lock:
+                session = supabase_client.auth.set_session(token, refresh_token)
+            
+            if not session.user:
+                raise Exception('Invalid session')
+            
+            user_id = session.user.id
+            access_token = session.session.access_token if session.session else token
+            claimed_role = None
+        else:
+            user_id = claims['sub']
+            access_token = token
+            claimed_role = (claims.get('user_metadata') or {}).get('role')
         
-        profile = profile_response.data[0]
+        profile = get_profile(user_id, access_token, claimed_role)
         
-        return {
-            'id': session.user.id,
+        g.current_user = {
+            'id': user_id,
             'email': profile['email'],
             'role': profile['role']
         }
+        g.access_token = access_token
+        return g.current_user
     except Exception as e:
         logger.error(f"Error in get_user_from_token: {str(e)}")
         raise Exception('Invalid or expired token')
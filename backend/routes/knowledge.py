@@ -5,11 +5,17 @@ import io
 from datetime import datetime
 from functools import wraps
 from .auth import get_user_from_token, requires_auth, requires_agent
-from config import supabase_client, logger
+from config import logger
 import traceback
 import base64
 from utils.rag_utils import rag_service
 from utils.async_utils import async_route
+from utils.supabase_pool import get_request_client
+from utils.idempotency import idempotent
+from utils.suggest import suggest_index
+from utils.etag import (
+    get_collection_version, make_collection_etag, is_not_modified, not_modified_response, with_etag
+)
 
 knowledge_bp = Blueprint('knowledge', __name__)
 
@@ -20,6 +26,7 @@ def allowed_file(filename):
 
 @knowledge_bp.route('/knowledge/upload', methods=['POST'])
 @requires_agent
+@idempotent
 @async_route
 async def upload_file():
     if 'file' not in request.files:
@@ -41,17 +48,7 @@ async def upload_file():
         if not token or not refresh_token:
             return jsonify({'error': 'No authorization tokens provided'}), 401
 
-        try:
-            # Set the session first
-            session = supabase_client.auth.set_session(token, refresh_token)
-            logger.info(f"Session user metadata: {session.user.user_metadata}")
-            logger.info(f"Session user role: {session.user.user_metadata.get('role')}")
-            logger.info(f"Session user ID: {session.user.id}")
-        except Exception as auth_error:
-            logger.error(f"Authentication error: {str(auth_error)}")
-            return jsonify({'error': 'Authentication failed'}), 401
-        
-        # Then get user info
+        # Get user info resolved by the auth decorator
         user = get_user_from_token(request)
         if not user:
             return jsonify({'error': 'Invalid user token'}), 401
@@ -86,18 +83,16 @@ async def upload_file():
             'file_type': file_type,
             'content': file_content,
             'file_size': file_size,
-            'uploaded_by': session.user.id,
+            'uploaded_by': user['id'],
             'uploaded_at': datetime.now().isoformat()
         }
         
-        # Log the Supabase client state
         logger.info("About to execute insert...")
-        logger.info(f"Current auth state - has session: {bool(supabase_client.auth.get_session())}")
         logger.info(f"File content preview: {file_content[:100] if isinstance(file_content, str) else '<binary>'}")
         
         try:
             result = (
-                supabase_client
+                get_request_client()
                 .table('knowledge_files')
                 .insert(file_data)
                 .execute()
@@ -107,6 +102,7 @@ async def upload_file():
                 return jsonify({'error': 'Failed to save file to database'}), 500
                 
             file_record = result.data[0]
+            suggest_index.file_saved(file_record)
             
             # Only upsert text-based files to Pinecone
             indexed = False
@@ -167,19 +163,25 @@ def list_files():
         if not token or not refresh_token:
             return jsonify({'error': 'No authorization tokens provided'}), 401
 
-        # Set the session and get current user
-        session = supabase_client.auth.set_session(token, refresh_token)
+        # Get Supabase client for the caller
+        client = get_request_client()
+        
+        # Skip the listing entirely when the client's copy is current
+        user = get_user_from_token(request)
+        etag = make_collection_etag(get_collection_version(client, 'knowledge_files'), user['role'])
+        if is_not_modified(etag):
+            return not_modified_response(etag)
         
         # First get all files
         result = (
-            supabase_client
+            client
             .table('knowledge_files')
             .select('id, filename, file_type, file_size, uploaded_by, uploaded_at')
             .execute()
         )
         
         if not hasattr(result, 'data') or not result.data:
-            return jsonify([]), 200
+            return with_etag(jsonify([]), etag), 200
             
         # Collect unique user IDs
         user_ids = list(set(file['uploaded_by'] for file in result.data if file.get('uploaded_by')))
@@ -190,7 +192,7 @@ def list_files():
             try:
                 # Call the get_user_email RPC function
                 email_result = (
-                    supabase_client
+                    client
                     .rpc('get_user_email', {'user_id': user_id})
                     .execute()
                 )
@@ -212,7 +214,7 @@ def list_files():
             'uploaded_at': file['uploaded_at']
         } for file in result.data]
         
-        return jsonify(files_data), 200
+        return with_etag(jsonify(files_data), etag), 200
 
     except Exception as e:
         logger.error(f"Failed to list files: {str(e)}")
@@ -231,11 +233,11 @@ def get_file(file_id):
         if not token or not refresh_token:
             return jsonify({'error': 'No authorization tokens provided'}), 401
 
-        # Set the session
-        supabase_client.auth.set_session(token, refresh_token)
+        # Get Supabase client for the caller
+        client = get_request_client()
         
         result = (
-            supabase_client
+            client
             .table('knowledge_files')
             .select('*')
             .eq('id', file_id)
@@ -277,11 +279,11 @@ def get_file_content(file_id):
         if not token or not refresh_token:
             return jsonify({'error': 'No authorization tokens provided'}), 401
 
-        # Set the session
-        supabase_client.auth.set_session(token, refresh_token)
+        # Get Supabase client for the caller
+        client = get_request_client()
         
         result = (
-            supabase_client
+            client
             .table('knowledge_files')
             .select('*')
             .eq('id', file_id)
@@ -332,11 +334,11 @@ def delete_file(file_id):
         if not token or not refresh_token:
             return jsonify({'error': 'No authorization tokens provided'}), 401
 
-        # Set the session
-        supabase_client.auth.set_session(token, refresh_token)
+        # Get Supabase client for the caller
+        client = get_request_client()
         
         result = (
-            supabase_client
+            client
             .table('knowledge_files')
             .delete()
             .eq('id', file_id)
@@ -346,6 +348,7 @@ def delete_file(file_id):
         if not hasattr(result, 'data') or not result.data:
             return jsonify({'error': 'File not found'}), 404
 
+        suggest_index.file_removed(file_id)
         return jsonify({'message': 'File deleted successfully'}), 200
 
     except Exception as e:
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from utils.rag_utils import rag_service
 from utils.auth import requires_auth
 from utils.async_utils import async_route
+from utils.idempotency import idempotent
 
 rag_bp = Blueprint('rag', __name__)
 
@@ -37,6 +38,7 @@ async def query_rag():
 
 @rag_bp.route('/upsert/files', methods=['POST'])
 @requires_auth
+@idempotent
 @async_route
 async def upsert_files():
     """
@@ -71,6 +73,7 @@ async def upsert_files():
 
 @rag_bp.route('/upsert/tickets', methods=['POST'])
 @requires_auth
+@idempotent
 @async_route
 async def upsert_tickets():
     """
@@ -119,9 +122,9 @@ async def delete_vectors():
         namespace = data['namespace']
         
         # Validate namespace
-        if namespace not in ['breeze_kb', 'breeze_tickets']:
+        if namespace not in ['breeze_kb', 'breeze_tickets', 'breeze_tickets_archive']:
             return jsonify({
-                'error': 'Namespace must be either breeze_kb or breeze_tickets'
+                'error': 'Namespace must be breeze_kb, breeze_tickets or breeze_tickets_archive'
             }), 400
         
         await rag_service.delete_by_ids(ids, namespace)
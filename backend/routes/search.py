@@ -1,84 +1,232 @@
 from flask import Blueprint, request, jsonify
-from config import supabase_client
+from config import logger
+import asyncio
+import traceback
+from .auth import requires_auth, get_user_from_token
+from utils.async_utils import async_route
+from utils.hybrid_search import reciprocal_rank_fusion
+from utils.rag_utils import rag_service
+from utils.suggest import suggest_index
+from utils.supabase_pool import get_request_client
 
 search_bp = Blueprint('search', __name__)
 
+# Tickets returned per page unless the caller asks for fewer
+MAX_SEARCH_RESULTS = 100
+
+# Suggestions returned by default, and at most
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 20
+
+# How deep hybrid search reads each ranking; fused results stop here
+HYBRID_CANDIDATES = 200
+
+SEARCH_MODES = ('lexical', 'hybrid')
+
+TICKET_RESULT_FIELDS = 'id, uuid, title, description, status, user_email, created_at'
+
+def search_knowledge_files(client, query):
+    """
+    Find knowledge files by content and by name
+
+    Content matches come first, best first, each with its best passage and
+    that passage's offset in the file. Files matching only by name follow,
+    newest first.
+    """
+    content_matches = client.rpc('search_knowledge', {
+        'p_query': query,
+        'p_limit': MAX_SEARCH_RESULTS
+    }).execute().data or []
+    
+    name_matches = (
+        client
+        .table('knowledge_files')
+        .select('id, filename, uploaded_at, uploaded_by, file_type, file_size')
+        .ilike('filename', f"%{query}%")
+        .order('uploaded_at', desc=True)
+        .limit(MAX_SEARCH_RESULTS)
+        .execute()
+    ).data or []
+    
+    matched = {f['id'] for f in content_matches}
+    files = content_matches + [f for f in name_matches if f['id'] not in matched]
+    
+    # Transform the files result to match the expected format
+    return [{
+        'id': f['id'],
+        'filename': f['filename'],
+        'created_at': f['uploaded_at'],
+        'user_email': f['uploaded_by'],
+        'file_type': f['file_type'],
+        'file_size': f['file_size'],
+        'passage': f.get('passage'),
+        'passage_offset': f.get('passage_offset')
+    } for f in files[:MAX_SEARCH_RESULTS]]
+
+async def hybrid_ticket_search(client, user, query, limit, offset):
+    """
+    Rank tickets by lexical and vector similarity together
+
+    Both searches read HYBRID_CANDIDATES deep, concurrently, and their
+    rankings are merged with reciprocal rank fusion. The depth is the same
+    for every page, since fused scores depend on it; otherwise the order
+    would shift between pages and offsets would skip or repeat tickets. If the vector search
+    fails the lexical ranking is used on its own.
+
+    Returns:
+        tuple: (one page of tickets, the next offset or None)
+    """
+    lexical, vector = await asyncio.gather(
+        asyncio.to_thread(lambda: client.rpc('search_tickets', {
+            'p_query': query,
+            'p_limit': HYBRID_CANDIDATES,
+            'p_offset': 0
+        }).execute().data or []),
+        rag_service.search_tickets(
+            query,
+            top_k=HYBRID_CANDIDATES,
+            user_email=None if user['role'] == 'agent' else user['email']
+        ),
+        return_exceptions=True
+    )
+    if isinstance(lexical, BaseException):
+        raise lexical
+    if isinstance(vector, BaseException):
+        logger.error(f"Vector ticket search failed, using lexical results only: {str(vector)}")
+        vector = []
+        
+    fused = reciprocal_rank_fusion({
+        'lexical': [ticket['id'] for ticket in lexical],
+        'vector': [match['ticket_id'] for match in vector]
+    })
+    page = fused[offset:offset + limit]
+    
+    # Vector-only hits aren't in the lexical rows; RLS still applies to them
+    tickets = {ticket['id']: ticket for ticket in lexical}
+    missing = [ticket_id for ticket_id, _, _ in page if ticket_id not in tickets]
+    if missing:
+        result = await asyncio.to_thread(
+            lambda: client.table('tickets').select(TICKET_RESULT_FIELDS).in_('id', missing).execute()
+        )
+        tickets.update({ticket['id']: ticket for ticket in result.data or []})
+        
+    results = [
+        {**tickets[ticket_id], 'score': score, 'matched_by': sources}
+        for ticket_id, score, sources in page
+        if ticket_id in tickets
+    ]
+    next_offset = offset + limit if len(fused) > offset + limit else None
+    return results, next_offset
+
 @search_bp.route('/api/search', methods=['GET'])
-def search():
-    # Get the token from the Authorization header
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'No valid token provided'}), 401
+@requires_auth
+@async_route
+async def search():
+    """
+    Search tickets and knowledge files
+
+    Tickets are matched with full-text search over their title, description
+    and responses, best match first. The query accepts web search syntax
+    ("quoted phrases", or, -excluded). Each ticket carries highlighted
+    title_highlight and snippet fields, with matches wrapped in <b> tags.
     
-    token = auth_header.split(' ')[1]
+    With mode=hybrid the full-text ranking is fused with vector similarity
+    over the ticket embeddings, which also finds tickets that describe the
+    same problem in other words. Hybrid results carry a fused score and
+    matched_by instead of highlights for tickets only the vectors found.
     
+    Agents also get knowledge files whose content or name matches. Content
+    matches carry their best passage, highlighted, and its character offset.
+
+    Query parameters:
+        q: The search query
+        limit: Tickets per page, at most 100
+        offset: Tickets to skip; pass back next_offset for the next page
+        mode: "lexical" (default) or "hybrid"
+    """
     try:
-        # Verify the token with Supabase
-        user = supabase_client.auth.get_user(token)
-        if not user or not user.user:
+        user = get_user_from_token(request)
+        if not user:
             return jsonify({'error': 'Invalid token'}), 401
-        
-        current_user = user.user.email
+            
         query = request.args.get('q', '').strip()
-        
         if not query:
-            return jsonify({'tickets': [], 'files': []})
-
-        # Check if user is an agent using user metadata
-        is_agent = user.user.user_metadata.get('role') == 'agent'
-
-        # Search tickets based on user role using Supabase
-        search_pattern = f"%{query}%"
+            return jsonify({'tickets': [], 'files': [], 'next_offset': None})
+            
+        try:
+            limit = min(int(request.args.get('limit', MAX_SEARCH_RESULTS)), MAX_SEARCH_RESULTS)
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'limit and offset must be integers'}), 400
+        if limit < 1 or offset < 0:
+            return jsonify({'error': 'limit must be positive and offset not negative'}), 400
+            
+        mode = request.args.get('mode', 'lexical')
+        if mode not in SEARCH_MODES:
+            return jsonify({'error': f"mode must be one of: {', '.join(SEARCH_MODES)}"}), 400
+            
+        # Get Supabase client for the caller
+        client = get_request_client()
+        
+        if mode == 'hybrid':
+            tickets, next_offset = await hybrid_ticket_search(client, user, query, limit, offset)
+        else:
+            # One extra row tells whether there is another page
+            tickets = client.rpc('search_tickets', {
+                'p_query': query,
+                'p_limit': limit + 1,
+                'p_offset': offset
+            }).execute().data or []
+            next_offset = offset + limit if len(tickets) > limit else None
+            tickets = tickets[:limit]
         
-        # Build tickets query
-        tickets_query = supabase_client.table('tickets') \
-            .select('id, title, description, status, user_email, created_at') \
-            .ilike('title', search_pattern)
-
-        # Get tickets matching description as well
-        tickets_desc_query = supabase_client.table('tickets') \
-            .select('id, title, description, status, user_email, created_at') \
-            .ilike('description', search_pattern)
-
-        # If not an agent, filter by user's email
-        if not is_agent:
-            tickets_query = tickets_query.eq('user_email', current_user)
-            tickets_desc_query = tickets_desc_query.eq('user_email', current_user)
-
-        # Execute both queries
-        title_results = tickets_query.execute()
-        desc_results = tickets_desc_query.execute()
-
-        # Combine and deduplicate results
-        all_tickets = {ticket['id']: ticket for ticket in title_results.data}
-        all_tickets.update({ticket['id']: ticket for ticket in desc_results.data})
-        tickets_result = list(all_tickets.values())
-
-        # Search knowledge files
-        files_query = supabase_client.table('knowledge_files') \
-            .select('id, filename, uploaded_at, uploaded_by, file_type, file_size') \
-            .ilike('filename', search_pattern)
-
-        files_result = files_query.execute()
-
-        # Sort results by created_at/uploaded_at in descending order
-        tickets_result.sort(key=lambda x: x['created_at'], reverse=True)
+        # The knowledge base is only visible to agents
+        files_data = search_knowledge_files(client, query) if user['role'] == 'agent' else []
         
-        # Transform the files result to match the expected format
-        files_data = [{
-            'id': f['id'],
-            'filename': f['filename'],
-            'created_at': f['uploaded_at'],
-            'user_email': f['uploaded_by'],
-            'file_type': f['file_type'],
-            'file_size': f['file_size']
-        } for f in files_result.data]
+        suggest_index.record_query(user, query)
         
         return jsonify({
-            'tickets': tickets_result[:100],  # Limit to 100 results
-            'files': files_data[:100]  # Limit to 100 results
+            'tickets': tickets,
+            'files': files_data,
+            'next_offset': next_offset
         })
+        
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@search_bp.route('/api/search/suggest', methods=['GET'])
+@requires_auth
+def suggest():
+    """
+    Autocomplete a search from ticket titles, knowledge filenames and
+    recent searches, served from memory
+
+    Any word of a title can match, so "reset" suggests "Password reset
+    fails". Customers only get their own tickets and searches.
 
+    Query parameters:
+        prefix: What the user has typed so far
+        limit: Suggestions to return, at most 20
+    """
+    try:
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
+            
+        prefix = request.args.get('prefix', '').strip()
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_SUGGESTIONS)), MAX_SUGGESTIONS)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+            
+        if not prefix or limit < 1:
+            return jsonify({'suggestions': []})
+            
+        return jsonify({'suggestions': suggest_index.suggest(get_request_client(), user, prefix, limit)})
+        
     except Exception as e:
-        print(f"Search error: {str(e)}")  # Add debug logging
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        logger.error(f"Suggest error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
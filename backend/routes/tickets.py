@@ -1,28 +1,78 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from datetime import datetime
-from config import supabase_client, logger
+import hashlib
+import json
+import time
+import threading
+from config import Config, logger
 from postgrest import APIError
 import traceback
 from .auth import requires_auth, get_user_from_token
-from utils.rag_utils import rag_service
-from utils.async_utils import async_route
+from utils.supabase_pool import get_request_client
+from utils.vector_outbox import outbox_worker
+from utils.idempotency import idempotent
+from utils.ticket_cache import ticket_cache, list_scope
+from utils.suggest import suggest_index
+from utils.etag import (
+    get_collection_version, make_collection_etag, is_not_modified, not_modified_response, with_etag
+)
+from utils.ticket_events import ticket_changes, format_event, event_position, parse_position
+from utils.ticket_export import EXPORT_CONTENT_TYPES, ndjson_line, csv_line
+from utils.ticket_import import ImportInterrupted, ImportJobBusy, detect_format, iter_rows, run_import
+from utils.ticket_query import (
+    QueryError, DEFAULT_PAGE_SIZE, TICKET_FIELDS, TICKET_STATUSES, TICKETS_WITH_ARCHIVE, RESPONSES_WITH_ARCHIVE,
+    parse_filters, parse_fields, parse_limit, parse_flag, ticket_table,
+    decode_cursor, apply_filters, paginate, split_page, DEFAULT_SORT
+)
 import uuid as uuid_pkg  # Rename to avoid conflict
 
 tickets_bp = Blueprint('tickets', __name__)
 
-def get_supabase_client(access_token, refresh_token):
-    try:
-        # Set the session
-        supabase_client.auth.set_session(access_token, refresh_token)
-        return supabase_client
-    except Exception as e:
-        logger.error(f"Error setting session: {str(e)}")
+# Maximum number of tickets that can be linked in one request
+MAX_LINK_BATCH = 500
+
+# Events read per query by the change feed, and how soon clients reconnect
+STREAM_EVENT_BATCH = 100
+STREAM_RETRY_MS = 3000
+
+# Rows fetched per keyset page by the export
+EXPORT_PAGE_SIZE = 1000
+
+# Tickets one bulk update may touch, and how many are updated per statement
+MAX_BULK_UPDATE = 5000
+BULK_UPDATE_CHUNK = 200
+
+# Open change feeds in this worker
+stream_slots = threading.BoundedSemaphore(Config.TICKET_STREAM_MAX_CLIENTS)
+
+def make_version_etag(version):
+    """ETag naming only a ticket's row version, for responses without the ticket"""
+    return f'"{version}"'
+
+def make_ticket_etag(ticket):
+    """
+    ETag for a ticket representation
+
+    The version only moves on edits, while responses also change
+    response_count and latest_response, so updated_at is folded in too.
+    The version stays first so the ETag still works as an If-Match value.
+    """
+    digest = hashlib.sha256(str(ticket.get('updated_at')).encode()).hexdigest()[:12]
+    return f'"{ticket["version"]}-{digest}"'
+
+def parse_if_match(header):
+    """Extract the ticket version from an If-Match header, accepting weak validators"""
+    if not header or header.strip() == '*':
         return None
+    value = header.split(',')[0].strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    return int(value.strip('"').split('-')[0])
 
 @tickets_bp.route('/tickets', methods=['POST'])
 @requires_auth
-@async_route
-async def create_ticket():
+@idempotent
+def create_ticket():
     try:
         # Get the raw token without 'Bearer ' prefix
         auth_header = request.headers.get('Authorization', '')
@@ -65,17 +115,14 @@ async def create_ticket():
             'status': 'open',
             'assignee': data.get('assignee', []),  # Get assignee from request or default to empty array
             'username': user.get('user_metadata', {}).get('full_name', email),
-            'responses': [],
             'related_uuids': [],
             'uuid': ticket_uuid
         }
         
         logger.info(f"Inserting ticket data: {ticket_data}")
         
-        # Get Supabase client with session
-        client = get_supabase_client(token, refresh_token)
-        if not client:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
+        # Get Supabase client for the caller
+        client = get_request_client()
         
         # Proceed with insert
         try:
@@ -88,25 +135,12 @@ async def create_ticket():
             logger.info(f"Insert result: {result}")
             
             if hasattr(result, 'data') and result.data:
-                # After successful ticket creation, upsert to Pinecone
+                # The insert queued the ticket for vector indexing
                 ticket = result.data[0]
-                await rag_service.upsert_tickets([{
-                    'id': str(ticket['id']),
-                    'uuid': ticket['uuid'],
-                    'title': ticket['title'],
-                    'content': ticket['description'],
-                    'metadata': {
-                        'user_email': ticket['user_email'],
-                        'status': ticket['status'],
-                        'created_at': ticket['created_at'],
-                        'updated_at': datetime.now().isoformat(),
-                        'uuid': ticket['uuid'],
-                        'username': ticket['username'],
-                        'assignee': ticket.get('assignee', []),
-                        'responses': ticket.get('responses', []),
-                        'related_uuids': ticket.get('related_uuids', [])
-                    }
-                }])
+                ticket_cache.invalidate_lists(ticket['user_email'])
+                suggest_index.ticket_saved(ticket)
+                ticket_changes.notify()
+                outbox_worker.wake()
                 return jsonify(ticket), 201
             else:
                 return jsonify({'error': 'No data returned from insert operation'}), 500
@@ -124,6 +158,133 @@ async def create_ticket():
             'details': str(e)
         }), 500
 
+@tickets_bp.route('/tickets/bulk', methods=['POST'])
+@requires_auth
+def bulk_import_tickets():
+    """
+    Import tickets from an NDJSON or CSV upload
+
+    The body is streamed and inserted in batches of IMPORT_BATCH_SIZE rows,
+    each of which advances the job's checkpoint. An interrupted import is
+    resumed by sending the same file again with ?job_id=<id>; rows before the
+    checkpoint are skipped. Imported tickets are embedded by the vector outbox.
+    """
+    try:
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
+            
+        if user['role'] != 'agent':
+            return jsonify({'error': 'Only agents can import tickets'}), 403
+            
+        try:
+            fmt = detect_format(request.content_type, request.args.get('format'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 415
+            
+        client = get_request_client()
+        
+        job_id = request.args.get('job_id')
+        if job_id:
+            try:
+                uuid_pkg.UUID(job_id)
+            except ValueError:
+                return jsonify({'error': 'Invalid job_id'}), 400
+                
+            result = client.table('import_jobs').select('*').eq('id', job_id).execute()
+            if not result.data:
+                return jsonify({'error': 'Import job not found'}), 404
+                
+            job = result.data[0]
+            if job['status'] == 'completed':
+                return jsonify(job)
+            if job['format'] != fmt:
+                return jsonify({'error': f"Import job expects {job['format']}"}), 400
+        else:
+            job = (
+                client
+                .table('import_jobs')
+                .insert({'created_by': user['id'], 'format': fmt})
+                .execute()
+            ).data[0]
+            
+        logger.info(f"Running import job {job['id']} from row {job['rows_processed']}")
+        
+        def imported(job):
+            ticket_cache.invalidate_lists()
+            ticket_changes.notify()
+            outbox_worker.wake()
+            
+        try:
+            job = run_import(
+                client,
+                job,
+                iter_rows(request.stream, fmt),
+                user['email'],
+                Config.IMPORT_BATCH_SIZE,
+                on_batch=imported
+            )
+        except ImportJobBusy:
+            return jsonify({'error': 'Import job is already running', 'job_id': job['id']}), 409
+        except ImportInterrupted as ie:
+            return jsonify({
+                'error': 'Import interrupted; resend the file with job_id to resume',
+                'details': str(ie),
+                'job_id': ie.job['id'],
+                'rows_processed': ie.job['rows_processed']
+            }), 500
+        finally:
+            # One rebuild for the whole upload rather than one per batch
+            suggest_index.reset()
+            
+        return jsonify(job)
+        
+    except Exception as e:
+        logger.error(f"Error importing tickets: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@tickets_bp.route('/tickets/bulk/<string:job_id>', methods=['GET'])
+@requires_auth
+def get_import_job(job_id):
+    """Report the progress of a bulk import"""
+    try:
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
+            
+        if user['role'] != 'agent':
+            return jsonify({'error': 'Only agents can import tickets'}), 403
+            
+        try:
+            uuid_pkg.UUID(job_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid job_id'}), 400
+            
+        result = get_request_client().table('import_jobs').select('*').eq('id', job_id).execute()
+        if not result.data:
+            return jsonify({'error': 'Import job not found'}), 404
+            
+        return jsonify(result.data[0])
+        
+    except Exception as e:
+        logger.error(f"Error fetching import job: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@tickets_bp.route('/tickets/cache/stats', methods=['GET'])
+@requires_auth
+def get_ticket_cache_stats():
+    """Report this worker's ticket cache sizes and hit rates"""
+    user = get_user_from_token(request)
+    if not user:
+        return jsonify({'error': 'Invalid token'}), 401
+        
+    if user['role'] != 'agent':
+        return jsonify({'error': 'Unauthorized access'}), 403
+        
+    return jsonify(ticket_cache.stats())
+
 @tickets_bp.route('/tickets', methods=['GET'])
 @requires_auth
 def get_tickets():
@@ -146,58 +307,243 @@ def get_tickets():
             
         logger.info(f"Fetching tickets for {email} with role {role}")
         
-        # Get Supabase client with session
-        client = get_supabase_client(token, refresh_token)
-        if not client:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
+        try:
+            filters = parse_filters(request.args, user)
+            fields = parse_fields(request.args.get('fields'), filters['sort'])
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            if cursor and not limit:
+                limit = DEFAULT_PAGE_SIZE
+            if cursor:
+                decode_cursor(cursor)
+        except QueryError as qe:
+            return jsonify({'error': str(qe)}), 400
+        
+        # Lists are cached per scope on the parsed query, so "me" is already resolved
+        scope = list_scope(user)
+        cache_key = (json.dumps(filters, sort_keys=True), tuple(fields or ()), limit, cursor)
+        
+        # Get Supabase client for the caller
+        client = get_request_client()
+        
+        # Answering a poll with 304 only needs the tickets' change counter
+        version = get_collection_version(client, 'tickets')
+        etag = make_collection_etag(version, user['id'], cache_key)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
         
-        # Define fields to select
-        select_fields = ['*', 'username', 'responses', 'related_uuids', 'assignee']
+        # The version is read before the query, so a body cached under it is
+        # never older than the tag it is served with
+        cache_key = cache_key + (version,)
+        cached = ticket_cache.get_list(scope, cache_key)
+        if cached is not None:
+            body, next_cursor = cached
+            response = current_app.response_class(body, mimetype='application/json')
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            return with_etag(response, etag)
+        
+        # Select only the requested fields so list views can skip heavy columns
+        query = (
+            client
+            .table(ticket_table(filters.get('include_archived', False)))
+            .select(','.join(fields) if fields else '*')
+        )
         
         # Query tickets based on role
         if role == 'customer':
             logger.info("Filtering tickets for customer")
             # Customers can only see their own tickets
-            result = (
-                client
-                .table('tickets')
-                .select(','.join(select_fields))
-                .eq('user_email', email)
-                .order('created_at', desc=True)
-                .execute()
-            )
+            query = query.eq('user_email', email)
         else:
             logger.info("Fetching all tickets for agent")
-            # Agents can see all tickets
-            result = (
-                client
-                .table('tickets')
-                .select(','.join(select_fields))
-                .order('created_at', desc=True)
-                .execute()
-            )
+        
+        # Filters and sorting are pushed down to PostgREST
+        query = apply_filters(query, filters)
             
+        result = paginate(query, cursor, limit, filters['sort']).execute()
         logger.info(f"Query result: {result}")
         
+        tickets, next_cursor = split_page(result.data or [], limit, filters['sort'])
+        
         # Process tickets to include additional metadata
-        if hasattr(result, 'data') and result.data:
-            tickets = result.data
-            for ticket in tickets:
-                # Ensure all array fields are initialized
-                ticket['responses'] = ticket.get('responses', [])
-                ticket['related_uuids'] = ticket.get('related_uuids', [])
-                ticket['assignee'] = ticket.get('assignee', [])
-                # Set username if not present
-                if not ticket.get('username'):
-                    ticket['username'] = ticket['user_email']
-            return jsonify(tickets)
-        return jsonify([])
+        for ticket in tickets:
+            # Ensure all selected array fields are initialized
+            for field in ['related_uuids', 'assignee']:
+                if not fields or field in fields:
+                    ticket[field] = ticket.get(field) or []
+            # Set username if not present
+            if (not fields or 'username' in fields) and not ticket.get('username'):
+                ticket['username'] = ticket.get('user_email')
+        
+        response = jsonify(tickets)
+        ticket_cache.set_list(scope, cache_key, response.get_data(), next_cursor)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return with_etag(response, etag)
         
     except Exception as e:
         logger.error(f"Error fetching tickets: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@tickets_bp.route('/tickets/export', methods=['GET'])
+@requires_auth
+def export_tickets():
+    """
+    Stream every ticket matching the list filters as NDJSON or CSV
+
+    Accepts the same filters, sort and fields as GET /tickets. Rows are read
+    in keyset pages of EXPORT_PAGE_SIZE and written out as they arrive, so
+    memory use doesn't grow with the number of tickets.
+    
+    The status is sent before the first row, so a failure partway through
+    ends the file with an error record instead: {"error": ..., "rows": n} in
+    NDJSON, or a row of "error", the message and the row count in CSV.
+    """
+    try:
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
+            
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_CONTENT_TYPES:
+            return jsonify({'error': 'format must be ndjson or csv'}), 400
+            
+        try:
+            filters = parse_filters(request.args, user)
+            fields = parse_fields(request.args.get('fields'), filters['sort']) or TICKET_FIELDS
+        except QueryError as qe:
+            return jsonify({'error': str(qe)}), 400
+            
+        logger.info(f"Exporting tickets as {fmt} for {user['email']}")
+        
+        # Get Supabase client for the caller
+        client = get_request_client()
+        
+    except Exception as e:
+        logger.error(f"Error starting ticket export: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+        
+    def fetch_page(cursor):
+        query = (
+            client
+            .table(ticket_table(filters.get('include_archived', False)))
+            .select(','.join(fields))
+        )
+        if user['role'] == 'customer':
+            query = query.eq('user_email', user['email'])
+        query = apply_filters(query, filters)
+        result = paginate(query, cursor, EXPORT_PAGE_SIZE, filters['sort']).execute()
+        return split_page(result.data or [], EXPORT_PAGE_SIZE, filters['sort'])
+        
+    def generate():
+        if fmt == 'csv':
+            yield csv_line(fields)
+            
+        cursor = None
+        count = 0
+        try:
+            while True:
+                rows, cursor = fetch_page(cursor)
+                for row in rows:
+                    yield csv_line([row.get(field) for field in fields]) if fmt == 'csv' else ndjson_line(row)
+                count += len(rows)
+                if not cursor:
+                    break
+        except Exception as e:
+            # Headers are already sent, so the error goes at the end of the file
+            logger.error(f"Ticket export stopped after {count} rows: {str(e)}")
+            logger.error(traceback.format_exc())
+            if fmt == 'csv':
+                yield csv_line(['error', str(e), count])
+            else:
+                yield ndjson_line({'error': str(e), 'rows': count})
+            
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename=tickets.{fmt}'}
+    )
+
+@tickets_bp.route('/tickets/stream', methods=['GET'])
+@requires_auth
+def stream_ticket_events():
+    """
+    Stream ticket changes as server-sent events
+
+    Events are read from the ticket_events log that database triggers fill:
+    created, updated, status_changed, response_added, linked and archived
+    (the ticket moved to the archive and left the hot list). Customers
+    only receive events for their own tickets. Streams wake up as soon as a
+    worker writes a ticket, and poll at each heartbeat to catch other writes.
+    A reconnecting client sends Last-Event-ID to resume where it left off.
+    """
+    try:
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
+            
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            position = parse_position(last_event_id) if last_event_id else None
+        except ValueError:
+            return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+            
+        client = get_request_client()
+        
+        if position is None:
+            # New subscribers only get changes from now on
+            position = (client.rpc('ticket_events_head', {}).execute().data, 0)
+            
+    except Exception as e:
+        logger.error(f"Error opening ticket stream: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+        
+    def generate(position):
+        deadline = time.monotonic() + Config.TICKET_STREAM_MAX_SECONDS
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        
+        try:
+            while time.monotonic() < deadline:
+                generation = ticket_changes.generation
+                
+                # Events from transactions still running are held back until they finish
+                events = client.rpc('ticket_events_since', {
+                    'p_txid': position[0],
+                    'p_id': position[1],
+                    'p_limit': STREAM_EVENT_BATCH
+                }).execute().data or []
+                
+                for event in events:
+                    yield format_event(event)
+                    position = event_position(event)
+                    
+                if len(events) == STREAM_EVENT_BATCH:
+                    continue
+                    
+                if not ticket_changes.wait(generation, Config.TICKET_STREAM_HEARTBEAT):
+                    yield ": keep-alive\n\n"
+        except Exception as e:
+            # The client reconnects with Last-Event-ID
+            logger.error(f"Ticket stream stopped: {str(e)}")
+            
+    # Streams hold a worker thread for their whole duration
+    if not stream_slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many open streams, retry later'})
+        response.headers['Retry-After'] = str(Config.TICKET_STREAM_HEARTBEAT)
+        return response, 503
+        
+    response = Response(
+        stream_with_context(generate(position)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(stream_slots.release)
+    return response
+
 @tickets_bp.route('/tickets/<int:ticket_id>', methods=['GET'])
 @requires_auth
 def get_ticket(ticket_id):
@@ -220,53 +566,191 @@ def get_ticket(ticket_id):
             
         logger.info(f"Fetching ticket {ticket_id} for {email}")
         
-        # Get Supabase client with session
-        client = get_supabase_client(token, refresh_token)
-        if not client:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
-        
-        # Define fields to select
-        select_fields = ['*', 'username', 'responses', 'related_uuids', 'assignee']
+        include_archived = parse_flag(request.args.get('include_archived'))
         
-        # Query specific ticket
-        query = (
-            client
-            .table('tickets')
-            .select(','.join(select_fields))
-            .eq('id', ticket_id)
-        )
-        
-        if role == 'customer':
-            # Customers can only see their own tickets
-            query = query.eq('user_email', email)
+        ticket = ticket_cache.get_ticket(ticket_id)
+        if ticket is not None and ticket.get('archived_at') and not include_archived:
+            # Cached from an include_archived read
+            ticket = None
             
-        result = query.execute()
-        logger.info(f"Query result: {result}")
-        
-        if not hasattr(result, 'data') or not result.data:
+        if ticket is None:
+            # Get Supabase client for the caller
+            client = get_request_client()
+            
+            # Define fields to select
+            select_fields = ['*', 'username', 'related_uuids', 'assignee']
+            
+            # Query specific ticket
+            query = (
+                client
+                .table(ticket_table(include_archived))
+                .select(','.join(select_fields))
+                .eq('id', ticket_id)
+            )
+            
+            if role == 'customer':
+                # Customers can only see their own tickets
+                query = query.eq('user_email', email)
+                
+            result = query.execute()
+            logger.info(f"Query result: {result}")
+            
+            if not hasattr(result, 'data') or not result.data:
+                return jsonify({'error': 'Ticket not found'}), 404
+                
+            # Process ticket to include additional metadata
+            ticket = result.data[0]
+            # Ensure all array fields are initialized
+            ticket['related_uuids'] = ticket.get('related_uuids', [])
+            ticket['assignee'] = ticket.get('assignee', [])
+            # Set username if not present
+            if not ticket.get('username'):
+                ticket['username'] = ticket['user_email']
+                
+            ticket_cache.set_ticket(ticket)
+        elif role == 'customer' and ticket['user_email'] != email:
+            # Cached tickets are shared, so apply the customer check here
             return jsonify({'error': 'Ticket not found'}), 404
             
-        # Process ticket to include additional metadata
-        ticket = result.data[0]
-        # Ensure all array fields are initialized
-        ticket['responses'] = ticket.get('responses', [])
-        ticket['related_uuids'] = ticket.get('related_uuids', [])
-        ticket['assignee'] = ticket.get('assignee', [])
-        # Set username if not present
-        if not ticket.get('username'):
-            ticket['username'] = ticket['user_email']
+        etag = make_ticket_etag(ticket)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
             
-        return jsonify(ticket)
+        return with_etag(jsonify(ticket), etag)
         
     except Exception as e:
         logger.error(f"Error fetching ticket: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@tickets_bp.route('/tickets/bulk-update', methods=['POST'])
+@requires_auth
+def bulk_update_tickets():
+    """
+    Apply one patch to many tickets
+
+    The tickets are given either as "ids" or as a "filter" object taking the
+    same parameters as GET /tickets. The patch may set "status" (or "close":
+    true), and replace "assignee". Tickets are updated with one statement per chunk of
+    BULK_UPDATE_CHUNK ids, and the result lists what happened to each id.
+    Vector metadata is refreshed in batches by the vector outbox; status and
+    assignee changes don't need new embeddings.
+    """
+    try:
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
+            
+        if user['role'] != 'agent':
+            return jsonify({'error': 'Only agents can bulk update tickets'}), 403
+            
+        data = request.get_json()
+        if not data or not isinstance(data.get('patch'), dict):
+            return jsonify({'error': 'A patch is required'}), 400
+            
+        patch = {}
+        if data['patch'].get('close'):
+            patch['status'] = 'closed'
+        if 'status' in data['patch']:
+            if data['patch']['status'] not in TICKET_STATUSES:
+                return jsonify({'error': f"Unknown status: {data['patch']['status']}"}), 400
+            patch['status'] = data['patch']['status']
+        if 'assignee' in data['patch']:
+            assignee = data['patch']['assignee']
+            if not isinstance(assignee, list) or not all(isinstance(a, str) for a in assignee):
+                return jsonify({'error': 'assignee must be a list of agent IDs'}), 400
+            patch['assignee'] = assignee
+        if not patch:
+            return jsonify({'error': 'The patch may only set status, assignee or close'}), 400
+            
+        # Get Supabase client for the caller
+        client = get_request_client()
+        
+        if 'ids' in data:
+            ids = data['ids']
+            if not isinstance(ids, list) or len(ids) > MAX_BULK_UPDATE:
+                return jsonify({'error': f'ids must be a list of at most {MAX_BULK_UPDATE} ticket IDs'}), 400
+            try:
+                ids = list(dict.fromkeys(int(ticket_id) for ticket_id in ids))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid ticket ID'}), 400
+        elif isinstance(data.get('filter'), dict):
+            try:
+                filters = parse_filters({
+                    k: ','.join(map(str, v)) if isinstance(v, list) else str(v)
+                    for k, v in data['filter'].items()
+                }, user)
+            except QueryError as qe:
+                return jsonify({'error': str(qe)}), 400
+                
+            # Resolve the filter to ids first, so results can be reported per ticket
+            ids, cursor = [], None
+            while True:
+                query = apply_filters(client.table('tickets').select('id,created_at'), filters)
+                result = paginate(query, cursor, EXPORT_PAGE_SIZE, DEFAULT_SORT).execute()
+                rows, cursor = split_page(result.data or [], EXPORT_PAGE_SIZE, DEFAULT_SORT)
+                ids.extend(row['id'] for row in rows)
+                if len(ids) > MAX_BULK_UPDATE:
+                    return jsonify({'error': f'The filter matches more than {MAX_BULK_UPDATE} tickets'}), 400
+                if not cursor:
+                    break
+        else:
+            return jsonify({'error': 'Either ids or filter is required'}), 400
+            
+        logger.info(f"Bulk updating {len(ids)} tickets with {patch}")
+        
+        # Each chunk commits on its own, so a failure leaves earlier chunks applied
+        updated = {}
+        failed, error = set(), None
+        try:
+            for i in range(0, len(ids), BULK_UPDATE_CHUNK):
+                chunk = ids[i:i + BULK_UPDATE_CHUNK]
+                try:
+                    result = (
+                        client
+                        .table('tickets')
+                        .update(patch)
+                        .in_('id', chunk)
+                        .execute()
+                    )
+                except Exception as e:
+                    logger.error(f"Bulk update stopped after {len(updated)} tickets: {str(e)}")
+                    failed, error = set(ids[i:]), str(e)
+                    break
+                rows = result.data or []
+                for ticket in rows:
+                    updated[ticket['id']] = ticket
+                # One invalidation message per chunk, not per ticket
+                ticket_cache.drop_tickets([ticket['id'] for ticket in rows])
+        finally:
+            if updated:
+                ticket_cache.invalidate_lists()
+                ticket_changes.notify()
+                outbox_worker.wake()
+                
+        results = []
+        for ticket_id in ids:
+            if ticket_id in updated:
+                results.append({'id': ticket_id, 'status': 'updated', 'version': updated[ticket_id]['version']})
+            elif ticket_id in failed:
+                results.append({'id': ticket_id, 'status': 'failed'})
+            else:
+                results.append({'id': ticket_id, 'status': 'not_found'})
+                
+        body = {'updated': len(updated), 'failed': len(failed), 'results': results}
+        if error:
+            # Earlier chunks stay applied; retrying the failed ids is safe
+            return jsonify({'error': error, **body}), 500
+        return jsonify(body)
+        
+    except Exception as e:
+        logger.error(f"Error bulk updating tickets: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
 @tickets_bp.route('/tickets/<int:ticket_id>', methods=['PUT'])
 @requires_auth
-@async_route
-async def update_ticket(ticket_id):
+def update_ticket(ticket_id):
     try:
         # Get the raw token without 'Bearer ' prefix
         auth_header = request.headers.get('Authorization', '')
@@ -290,28 +774,16 @@ async def update_ticket(ticket_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
             
-        # Get Supabase client with session
-        client = get_supabase_client(token, refresh_token)
-        if not client:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
-        
-        # Check if ticket exists and user has access
-        existing_ticket = (
-            client
-            .table('tickets')
-            .select('*')
-            .eq('id', ticket_id)
-        )
-        
-        if role == 'customer':
-            existing_ticket = existing_ticket.eq('user_email', email)
-            
-        result = existing_ticket.execute()
-        
-        if not hasattr(result, 'data') or not result.data:
-            return jsonify({'error': 'Ticket not found or access denied'}), 404
+        # Clients send the version they edited via If-Match (or the body) to detect lost updates
+        try:
+            expected_version = parse_if_match(request.headers.get('If-Match'))
+            if expected_version is None and data.get('version') is not None:
+                expected_version = int(data['version'])
+        except ValueError:
+            return jsonify({'error': 'Invalid ticket version'}), 400
             
-        current_ticket = result.data[0]
+        # Get Supabase client for the caller
+        client = get_request_client()
         
         # Prepare update data based on user role
         update_data = {}
@@ -320,70 +792,101 @@ async def update_ticket(ticket_id):
         if role == 'customer':
             if 'description' in data:
                 update_data['description'] = data['description']
-            if 'responses' in data:
-                # Append new responses to existing ones
-                current_responses = current_ticket.get('responses', [])
-                new_response = {
-                    'content': data['responses'][-1]['content'],
-                    'created_at': datetime.now().isoformat(),
-                    'user_email': email,
-                    'username': user.get('user_metadata', {}).get('full_name', email)
-                }
-                update_data['responses'] = current_responses + [new_response]
         else:
             # Agents can update all fields
-            allowed_fields = ['description', 'status', 'assignee', 'responses']
+            allowed_fields = ['description', 'status', 'assignee']
             for field in allowed_fields:
                 if field in data:
-                    if field == 'responses' and data[field]:
-                        # Handle responses similar to customer case
-                        current_responses = current_ticket.get('responses', [])
-                        new_response = {
-                            'content': data['responses'][-1]['content'],
-                            'created_at': datetime.now().isoformat(),
-                            'user_email': email,
-                            'username': user.get('user_metadata', {}).get('full_name', email)
-                        }
-                        update_data['responses'] = current_responses + [new_response]
-                    else:
-                        update_data[field] = data[field]
+                    update_data[field] = data[field]
             
             # Handle related_uuids separately to prevent accidental overwrites
             if 'related_uuids' in data:
-                current_related = set(current_ticket.get('related_uuids', []))
+                current_result = (
+                    client
+                    .table('tickets')
+                    .select('related_uuids')
+                    .eq('id', ticket_id)
+                    .execute()
+                )
+                if not current_result.data:
+                    return jsonify({'error': 'Ticket not found or access denied'}), 404
+                    
+                current_related = set(current_result.data[0].get('related_uuids') or [])
                 new_related = set(data['related_uuids'])
                 update_data['related_uuids'] = list(current_related.union(new_related))
         
-        # Update the ticket
-        update_result = (
-            client
-            .table('tickets')
-            .update(update_data)
-            .eq('id', ticket_id)
-            .execute()
-        )
+        if not update_data and not data.get('responses'):
+            return jsonify({'error': 'No updatable fields provided'}), 400
+        
+        update_result = None
+        if update_data:
+            # Apply the role and version checks in the update itself: one round trip
+            update_query = (
+                client
+                .table('tickets')
+                .update(update_data)
+                .eq('id', ticket_id)
+            )
+            
+            if role == 'customer':
+                update_query = update_query.eq('user_email', email)
+            if expected_version is not None:
+                update_query = update_query.eq('version', expected_version)
+                
+            update_result = update_query.execute()
+            
+            if not update_result.data:
+                # Nothing matched; work out whether the ticket is missing or was changed concurrently
+                current_query = (
+                    client
+                    .table('tickets')
+                    .select('id, version')
+                    .eq('id', ticket_id)
+                )
+                
+                if role == 'customer':
+                    current_query = current_query.eq('user_email', email)
+                    
+                current_result = current_query.execute()
+                
+                if current_result.data and expected_version is not None:
+                    current_version = current_result.data[0]['version']
+                    response = jsonify({
+                        'error': 'Ticket was modified by someone else',
+                        'current_version': current_version
+                    })
+                    response.headers['ETag'] = make_version_etag(current_version)
+                    return response, 409
+                    
+                return jsonify({'error': 'Ticket not found or access denied'}), 404
+        
+        if data.get('responses'):
+            # Appending a response checks access server-side and returns the refreshed ticket
+            try:
+                update_result = (
+                    client
+                    .rpc('add_ticket_response', {
+                        'p_ticket_id': ticket_id,
+                        'p_content': data['responses'][-1]['content'],
+                        'p_username': user.get('user_metadata', {}).get('full_name', email)
+                    })
+                    .execute()
+                )
+            except APIError as api_e:
+                if api_e.code == 'PT404':
+                    return jsonify({'error': 'Ticket not found or access denied'}), 404
+                raise
         
         if hasattr(update_result, 'data') and update_result.data:
-            # After successful ticket update, upsert to Pinecone
+            # The update queued the ticket for re-indexing
             ticket = update_result.data[0]
-            await rag_service.upsert_tickets([{
-                'id': str(ticket['id']),
-                'uuid': ticket['uuid'],
-                'title': ticket['title'],
-                'content': ticket['description'],
-                'metadata': {
-                    'user_email': ticket['user_email'],
-                    'status': ticket['status'],
-                    'created_at': ticket['created_at'],
-                    'updated_at': datetime.now().isoformat(),
-                    'uuid': ticket['uuid'],
-                    'username': ticket['username'],
-                    'assignee': ticket.get('assignee', []),
-                    'responses': ticket.get('responses', []),
-                    'related_uuids': ticket.get('related_uuids', [])
-                }
-            }])
-            return jsonify(ticket)
+            ticket_cache.invalidate_ticket(ticket_id, ticket['user_email'])
+            suggest_index.ticket_saved(ticket)
+            ticket_changes.notify()
+            outbox_worker.wake()
+            response = jsonify(ticket)
+            response.headers['ETag'] = make_ticket_etag(ticket)
+            return response
         else:
             return jsonify({'error': 'Failed to update ticket'}), 500
             
@@ -414,46 +917,138 @@ def get_ticket_by_uuid(uuid):
             
         logger.info(f"Fetching ticket with UUID {uuid} for {email}")
         
-        # Get Supabase client with session
-        client = get_supabase_client(token, refresh_token)
-        if not client:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
+        include_archived = parse_flag(request.args.get('include_archived'))
         
-        # Define fields to select
-        select_fields = ['*', 'username', 'responses', 'related_uuids', 'assignee']
+        ticket = ticket_cache.get_ticket_by_uuid(uuid)
+        if ticket is not None and ticket.get('archived_at') and not include_archived:
+            # Cached from an include_archived read
+            ticket = None
+            
+        if ticket is None:
+            # Get Supabase client for the caller
+            client = get_request_client()
+            
+            # Define fields to select
+            select_fields = ['*', 'username', 'related_uuids', 'assignee']
+            
+            # Query specific ticket by UUID
+            query = (
+                client
+                .table(ticket_table(include_archived))
+                .select(','.join(select_fields))
+                .eq('uuid', uuid)
+            )
+            
+            if role == 'customer':
+                # Customers can only see their own tickets
+                query = query.eq('user_email', email)
+                
+            result = query.execute()
+            logger.info(f"Query result: {result}")
+            
+            if not hasattr(result, 'data') or not result.data:
+                return jsonify({'error': 'Ticket not found'}), 404
+                
+            # Process ticket to include additional metadata
+            ticket = result.data[0]
+            # Ensure all array fields are initialized
+            ticket['related_uuids'] = ticket.get('related_uuids', [])
+            ticket['assignee'] = ticket.get('assignee', [])
+            # Set username if not present
+            if not ticket.get('username'):
+                ticket['username'] = ticket['user_email']
+                
+            ticket_cache.set_ticket(ticket)
+        elif role == 'customer' and ticket['user_email'] != email:
+            # Cached tickets are shared, so apply the customer check here
+            return jsonify({'error': 'Ticket not found'}), 404
+            
+        etag = make_ticket_etag(ticket)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+            
+        return with_etag(jsonify(ticket), etag)
         
-        # Query specific ticket by UUID
-        query = (
-            client
-            .table('tickets')
-            .select(','.join(select_fields))
-            .eq('uuid', uuid)
-        )
+    except Exception as e:
+        logger.error(f"Error fetching ticket by UUID: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@tickets_bp.route('/tickets/<int:ticket_id>/responses', methods=['GET'])
+@requires_auth
+def get_ticket_responses(ticket_id):
+    try:
+        # Get user from token
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
+            
+        email = user['email']
+        role = user['role']
         
-        if role == 'customer':
-            # Customers can only see their own tickets
-            query = query.eq('user_email', email)
+        try:
+            limit = parse_limit(request.args.get('limit')) or DEFAULT_PAGE_SIZE
+            cursor = request.args.get('cursor')
+            after_id = int(cursor) if cursor else None
+        except (QueryError, ValueError) as qe:
+            return jsonify({'error': str(qe)}), 400
             
-        result = query.execute()
-        logger.info(f"Query result: {result}")
+        include_archived = parse_flag(request.args.get('include_archived'))
         
-        if not hasattr(result, 'data') or not result.data:
-            return jsonify({'error': 'Ticket not found'}), 404
+        logger.info(f"Fetching responses for ticket {ticket_id}")
+        
+        # Get Supabase client for the caller
+        client = get_request_client()
+        
+        # Responses are returned oldest first, paged by id
+        if include_archived:
+            # The archive view can't be joined, so check ticket ownership first
+            if role == 'customer':
+                owner = (
+                    client
+                    .table(TICKETS_WITH_ARCHIVE)
+                    .select('id')
+                    .eq('id', ticket_id)
+                    .eq('user_email', email)
+                    .execute()
+                )
+                if not owner.data:
+                    return jsonify([])
+            query = client.table(RESPONSES_WITH_ARCHIVE).select('*')
+        elif role == 'customer':
+            # Join the ticket so customers only see responses on their own tickets
+            query = (
+                client
+                .table('ticket_responses')
+                .select('*, tickets!inner(user_email)')
+                .eq('tickets.user_email', email)
+            )
+        else:
+            query = client.table('ticket_responses').select('*')
             
-        # Process ticket to include additional metadata
-        ticket = result.data[0]
-        # Ensure all array fields are initialized
-        ticket['responses'] = ticket.get('responses', [])
-        ticket['related_uuids'] = ticket.get('related_uuids', [])
-        ticket['assignee'] = ticket.get('assignee', [])
-        # Set username if not present
-        if not ticket.get('username'):
-            ticket['username'] = ticket['user_email']
+        query = query.eq('ticket_id', ticket_id)
+        
+        if after_id is not None:
+            query = query.gt('id', after_id)
             
-        return jsonify(ticket)
+        result = query.order('id').limit(limit + 1).execute()
+        
+        responses = result.data or []
+        for response in responses:
+            response.pop('tickets', None)
+        
+        next_cursor = None
+        if len(responses) > limit:
+            responses = responses[:limit]
+            next_cursor = str(responses[-1]['id'])
+        
+        response = jsonify(responses)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
         
     except Exception as e:
-        logger.error(f"Error fetching ticket by UUID: {str(e)}")
+        logger.error(f"Error fetching ticket responses: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
@@ -480,10 +1075,8 @@ def get_related_tickets(ticket_id):
             
         logger.info(f"Fetching related tickets for ticket {ticket_id}")
         
-        # Get Supabase client with session
-        client = get_supabase_client(token, refresh_token)
-        if not client:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
+        # Get Supabase client for the caller
+        client = get_request_client()
         
         # First get the current ticket to check access and get its UUID
         current_ticket = (
@@ -504,48 +1097,40 @@ def get_related_tickets(ticket_id):
         current_ticket_data = result.data[0]
         current_uuid = current_ticket_data['uuid']
         
-        # Get relationships where current ticket is either ticket_uuid_1 or ticket_uuid_2
-        relationships_1 = (
-            client
-            .table('ticket_relationships')
-            .select('ticket_uuid_2')
-            .eq('ticket_uuid_1', current_uuid)
-            .execute()
-        )
-        
-        relationships_2 = (
+        # Get relationships where current ticket is either uuid_1 or uuid_2 in one query
+        relationships = (
             client
             .table('ticket_relationships')
-            .select('ticket_uuid_1')
-            .eq('ticket_uuid_2', current_uuid)
+            .select('uuid_1, uuid_2')
+            .or_(f"uuid_1.eq.{current_uuid},uuid_2.eq.{current_uuid}")
             .execute()
         )
         
-        # Combine related ticket UUIDs
+        # Collect the UUID on the other side of each relationship
         related_uuids = []
-        
-        if hasattr(relationships_1, 'data') and relationships_1.data:
-            related_uuids.extend([r['ticket_uuid_2'] for r in relationships_1.data])
-            
-        if hasattr(relationships_2, 'data') and relationships_2.data:
-            related_uuids.extend([r['ticket_uuid_1'] for r in relationships_2.data])
+        for relationship in relationships.data or []:
+            other_uuid = relationship['uuid_2'] if relationship['uuid_1'] == current_uuid else relationship['uuid_1']
+            if other_uuid not in related_uuids:
+                related_uuids.append(other_uuid)
             
-        # Get related tickets
+        # Get all related tickets in a single batched query
         related_tickets = []
-        for uuid in related_uuids:
+        if related_uuids:
             query = (
                 client
                 .table('tickets')
-                .select('*, uuid')
-                .eq('uuid', uuid)
+                .select('*')
+                .in_('uuid', related_uuids)
             )
             
             if role == 'customer':
                 query = query.eq('user_email', email)
                 
-            ticket_result = query.execute()
-            if hasattr(ticket_result, 'data') and ticket_result.data:
-                related_tickets.append(ticket_result.data[0])
+            tickets_result = query.execute()
+            
+            # Keep the relationship order
+            tickets_by_uuid = {ticket['uuid']: ticket for ticket in tickets_result.data or []}
+            related_tickets = [tickets_by_uuid[uuid] for uuid in related_uuids if uuid in tickets_by_uuid]
         
         return jsonify({
             'current_ticket': current_ticket_data,
@@ -557,18 +1142,10 @@ def get_related_tickets(ticket_id):
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
-@tickets_bp.route('/tickets/<int:ticket_id>/link', methods=['POST'])
+@tickets_bp.route('/tickets/<int:ticket_id>/cluster', methods=['GET'])
 @requires_auth
-def link_tickets(ticket_id):
+def get_ticket_cluster(ticket_id):
     try:
-        # Get the raw token without 'Bearer ' prefix
-        auth_header = request.headers.get('Authorization', '')
-        token = auth_header.replace('Bearer ', '') if auth_header else None
-        refresh_token = request.headers.get('X-Refresh-Token')
-        
-        if not token or not refresh_token:
-            return jsonify({'error': 'No authorization tokens provided'}), 401
-            
         # Get user from token
         user = get_user_from_token(request)
         if not user:
@@ -577,90 +1154,125 @@ def link_tickets(ticket_id):
         email = user['email']
         role = user['role']
             
-        data = request.get_json()
-        if not data or 'related_uuid' not in data:
-            return jsonify({'error': 'Related ticket UUID is required'}), 400
-            
-        related_uuid = data['related_uuid']
-        logger.info(f"Linking ticket {ticket_id} with ticket UUID {related_uuid}")
+        logger.info(f"Fetching ticket cluster for ticket {ticket_id}")
         
-        # Get Supabase client with session
-        client = get_supabase_client(token, refresh_token)
-        if not client:
-            return jsonify({'error': 'Failed to initialize Supabase client'}), 500
+        # Get Supabase client for the caller
+        client = get_request_client()
         
-        # First get the current ticket to check access and get its UUID
-        current_ticket = (
-            client
-            .table('tickets')
-            .select('*')
-            .eq('id', ticket_id)
-        )
+        # Read the whole incident cluster from the cluster index in one query
+        query = client.rpc('get_ticket_cluster', {'p_ticket_id': ticket_id})
         
         if role == 'customer':
-            current_ticket = current_ticket.eq('user_email', email)
+            query = query.eq('user_email', email)
             
-        result = current_ticket.execute()
+        result = query.execute()
+        cluster = result.data or []
         
-        if not hasattr(result, 'data') or not result.data:
-            return jsonify({'error': 'Ticket not found or access denied'}), 404
+        current_ticket_data = next((ticket for ticket in cluster if ticket['id'] == ticket_id), None)
+        
+        if current_ticket_data is None:
+            # Tickets that were never linked have no cluster entry
+            current_ticket = (
+                client
+                .table('tickets')
+                .select('*')
+                .eq('id', ticket_id)
+            )
             
-        current_ticket_data = result.data[0]
-        current_uuid = current_ticket_data['uuid']
+            if role == 'customer':
+                current_ticket = current_ticket.eq('user_email', email)
+                
+            current_result = current_ticket.execute()
+            
+            if not current_result.data:
+                return jsonify({'error': 'Ticket not found or access denied'}), 404
+                
+            current_ticket_data = current_result.data[0]
+            cluster = [current_ticket_data]
         
-        # Check if the related ticket exists
-        related_ticket = (
-            client
-            .table('tickets')
-            .select('*')
-            .eq('uuid', related_uuid)
-        )
+        return jsonify({
+            'current_ticket': current_ticket_data,
+            'cluster_tickets': [ticket for ticket in cluster if ticket['id'] != ticket_id],
+            'size': len(cluster)
+        })
         
-        if role == 'customer':
-            related_ticket = related_ticket.eq('user_email', email)
+    except Exception as e:
+        logger.error(f"Error fetching ticket cluster: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@tickets_bp.route('/tickets/<int:ticket_id>/link', methods=['POST'])
+@requires_auth
+@idempotent
+def link_tickets(ticket_id):
+    try:
+        # Get user from token
+        user = get_user_from_token(request)
+        if not user:
+            return jsonify({'error': 'Invalid token'}), 401
             
-        related_result = related_ticket.execute()
-        
-        if not hasattr(related_result, 'data') or not related_result.data:
-            return jsonify({'error': 'Related ticket not found or access denied'}), 404
+        data = request.get_json()
+        if not data or not (data.get('related_uuid') or data.get('related_uuids')):
+            return jsonify({'error': 'Related ticket UUID is required'}), 400
             
-        # Create or update ticket relationships
-        # First check if relationship already exists
-        existing_relationship = (
-            client
-            .table('ticket_relationships')
-            .select('*')
-            .eq('uuid_1', current_uuid)
-            .eq('uuid_2', related_uuid)
-            .execute()
-        )
+        # Accept a single UUID or a batch for mass incident triage
+        single = 'related_uuids' not in data
+        related_uuids = [data['related_uuid']] if single else data['related_uuids']
         
-        if not hasattr(existing_relationship, 'data') or not existing_relationship.data:
-            # Create new relationship
-            relationship_data = {
-                'uuid_1': current_uuid,
-                'uuid_2': related_uuid,
-                'created_at': datetime.now().isoformat(),
-                'created_by': email
-            }
+        if not isinstance(related_uuids, list) or len(related_uuids) > MAX_LINK_BATCH:
+            return jsonify({'error': f'related_uuids must be a list of at most {MAX_LINK_BATCH} UUIDs'}), 400
             
-            relationship_result = (
+        try:
+            related_uuids = list(dict.fromkeys(str(uuid_pkg.UUID(str(u))) for u in related_uuids))
+        except ValueError:
+            return jsonify({'error': 'Invalid ticket UUID'}), 400
+            
+        logger.info(f"Linking ticket {ticket_id} with ticket UUIDs {related_uuids}")
+        
+        # Get Supabase client for the caller
+        client = get_request_client()
+        
+        # Validate both sides, check access and upsert the links in one transaction
+        try:
+            result = (
                 client
-                .table('ticket_relationships')
-                .insert(relationship_data)
+                .rpc('link_tickets', {
+                    'p_ticket_id': ticket_id,
+                    'p_related_uuids': related_uuids
+                })
                 .execute()
             )
+        except APIError as api_e:
+            if api_e.code == 'PT404':
+                return jsonify({'error': 'Ticket not found or access denied'}), 404
+            if api_e.code == 'PT403':
+                return jsonify({'error': 'Access denied'}), 403
+            raise
             
-            if not hasattr(relationship_result, 'data'):
-                return jsonify({'error': 'Failed to create ticket relationship'}), 500
+        link_result = result.data
+        
+        # Drop cached copies of every ticket the link touched, in one message
+        ticket_cache.drop_tickets([ticket_id] + [linked['id'] for linked in link_result['linked']])
+        ticket_changes.notify()
+        
+        if single:
+            if not link_result['linked']:
+                return jsonify({'error': 'Related ticket not found or access denied'}), 404
                 
+            return jsonify({
+                'message': 'Tickets linked successfully',
+                'ticket_1': link_result['ticket'],
+                'ticket_2': link_result['linked'][0]
+            })
+            
         return jsonify({
-            'message': 'Tickets linked successfully',
-            'ticket_1': current_ticket_data,
-            'ticket_2': related_result.data[0]
+            'message': f"Linked {len(link_result['linked'])} tickets",
+            'ticket': link_result['ticket'],
+            'linked': link_result['linked'],
+            'missing': link_result['missing']
         })
         
     except Exception as e:
         logger.error(f"Error linking tickets: {str(e)}")
         logger.error(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,7 +1,8 @@
 from flask import Blueprint, jsonify, request
-from config import supabase_client, logger
+from config import logger
 import traceback
 from .auth import requires_auth, get_user_from_token
+from utils.supabase_pool import get_request_client
 
 users_bp = Blueprint('users', __name__)
 
@@ -19,8 +20,8 @@ def get_agents():
             return jsonify({'error': 'Unauthorized access'}), 403
 
         try:
-            # Use regular client to fetch users with agent role
-            response = supabase_client.table('users').select('id, email, metadata').eq('role', 'agent').execute()
+            # Fetch users with agent role as the caller
+            response = get_request_client().table('users').select('id, email, metadata').eq('role', 'agent').execute()
             users = response.data if response else []
             
             # Format response
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Modules import each other as top-level packages (utils, routes, config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config refuses to load without a Supabase project; tests never reach it
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'test.anon.key')
@@ -0,0 +1,38 @@
+import pytest
+from postgrest import APIError
+from utils import idempotency
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+class ContendedTable:
+    """A key another request keeps re-creating: inserts conflict, reads find nothing"""
+
+    def insert(self, record):
+        return self
+
+    def select(self, columns):
+        self.selecting = True
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        if getattr(self, 'selecting', False):
+            self.selecting = False
+            return FakeResult([])
+        raise APIError({'message': 'duplicate key value', 'code': '23505'})
+
+class FakeClient:
+    def table(self, name):
+        return ContendedTable()
+
+@pytest.fixture
+def contended(monkeypatch):
+    monkeypatch.setattr(idempotency, 'get_request_client', lambda: FakeClient())
+
+def test_claim_reports_in_progress_when_retries_run_out(contended):
+    record = idempotency._claim('user', 'POST /tickets', 'key', 'hash')
+    assert record == {'request_hash': 'hash', 'status_code': None}
@@ -0,0 +1,70 @@
+import json
+import socket
+import threading
+import time
+from utils.invalidation import MAX_MESSAGE_SIZE, InvalidationBus
+from utils.ticket_cache import TicketCache
+
+def start_peer(socket_dir, cache, delay):
+    """Stand in for another worker: a socket that applies messages slowly"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(str(socket_dir / '1.sock'))
+
+    def listen():
+        while True:
+            try:
+                data = sock.recv(MAX_MESSAGE_SIZE)
+            except OSError:
+                return
+            cache._apply(json.loads(data)['message'])
+            time.sleep(delay)
+
+    threading.Thread(target=listen, daemon=True).start()
+    return sock
+
+def fill(cache, ticket_ids):
+    for ticket_id in ticket_ids:
+        cache.set_ticket({'id': ticket_id, 'uuid': f'uuid-{ticket_id}'})
+
+def wait_for_empty(cache, ticket_ids):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        remaining = [ticket_id for ticket_id in ticket_ids if cache.get_ticket(ticket_id)]
+        if not remaining:
+            return []
+        time.sleep(0.01)
+    return remaining
+
+def test_burst_of_single_drops_reaches_a_slow_peer(tmp_path):
+    receiver = TicketCache()
+    peer = start_peer(tmp_path, receiver, delay=0.001)
+    bus = InvalidationBus(str(tmp_path), send_timeout=1)
+    bus.start()
+    sender = TicketCache(bus=bus)
+
+    ticket_ids = list(range(500))
+    fill(receiver, ticket_ids)
+    for ticket_id in ticket_ids:
+        sender.drop_ticket(ticket_id)
+
+    assert wait_for_empty(receiver, ticket_ids) == []
+    peer.close()
+
+def test_drop_tickets_batches_ids(tmp_path):
+    receiver = TicketCache()
+    peer = start_peer(tmp_path, receiver, delay=0)
+    bus = InvalidationBus(str(tmp_path))
+    bus.start()
+    sender = TicketCache(bus=bus)
+
+    sent = []
+    publish = bus.publish
+    bus.publish = lambda channel, message: (sent.append(message), publish(channel, message))
+
+    ticket_ids = list(range(2500))
+    fill(receiver, ticket_ids)
+    sender.drop_tickets(ticket_ids)
+
+    assert len(sent) == 3
+    assert wait_for_empty(receiver, ticket_ids) == []
+    peer.close()
@@ -0,0 +1,122 @@
+import io
+import json
+import uuid
+import pytest
+from postgrest import APIError
+from utils.ticket_import import (
+    ImportInterrupted,
+    ImportJobBusy,
+    ImportRowError,
+    iter_rows,
+    normalize_row,
+    run_import
+)
+
+JOB_ID = str(uuid.uuid4())
+
+def rows_from_ndjson(*rows):
+    stream = io.BytesIO(''.join(json.dumps(row) + '\n' for row in rows).encode())
+    return list(iter_rows(stream, 'ndjson'))
+
+def test_non_string_values_are_coerced():
+    [(number, row)] = rows_from_ndjson({
+        'title': 123,
+        'description': 4.5,
+        'user_email': 42,
+        'username': 7
+    })
+    ticket = normalize_row(row, JOB_ID, number, 'agent@example.com')
+    assert ticket['title'] == '123'
+    assert ticket['description'] == '4.5'
+    assert ticket['user_email'] == '42'
+    assert ticket['username'] == '7'
+
+@pytest.mark.parametrize('row', [
+    {'title': 't', 'description': 'd', 'status': 1},
+    {'title': 't', 'description': 'd', 'uuid': 123},
+    {'title': {'a': 1}, 'description': 'd'},
+    {'title': 't', 'description': 'd', 'created_at': ['2024-01-01']}
+])
+def test_invalid_non_string_values_are_row_errors(row):
+    [(number, parsed)] = rows_from_ndjson(row)
+    with pytest.raises(ImportRowError):
+        normalize_row(parsed, JOB_ID, number, 'agent@example.com')
+
+def test_generated_uuid_is_stable_per_row():
+    row = {'title': 't', 'description': 'd'}
+    first = normalize_row(row, JOB_ID, 3, 'agent@example.com')
+    second = normalize_row(row, JOB_ID, 3, 'agent@example.com')
+    assert first['uuid'] == second['uuid']
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+class FakeQuery:
+    def __init__(self, execute):
+        self._execute = execute
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        return FakeResult(self._execute())
+
+class FakeClient:
+    """Answers import_ticket_batch until fail_on_call, and records job updates"""
+
+    def __init__(self, fail_on_call=None, error=None):
+        self.fail_on_call = fail_on_call
+        self.error = error or APIError({'message': 'connection reset', 'code': '08006'})
+        self.calls = 0
+        self.updates = []
+
+    def rpc(self, name, params):
+        def execute():
+            self.calls += 1
+            if self.calls == self.fail_on_call:
+                raise self.error
+            return [{
+                'id': params['p_job_id'],
+                'rows_processed': params['p_offset'] + params['p_row_count'],
+                'inserted': len(params['p_rows'])
+            }]
+        return FakeQuery(execute)
+
+    def table(self, name):
+        client = self
+
+        class Table:
+            def update(self, values):
+                client.updates.append(values)
+                return FakeQuery(lambda: [{'id': JOB_ID, **values}])
+
+        return Table()
+
+def new_job():
+    return {'id': JOB_ID, 'rows_processed': 0}
+
+def ticket_rows(count):
+    return [(number, {'title': f't{number}', 'description': 'd'}) for number in range(count)]
+
+def test_import_failing_mid_batch_marks_the_job_failed():
+    client = FakeClient(fail_on_call=2)
+    batches = []
+    with pytest.raises(ImportInterrupted) as interrupted:
+        run_import(client, new_job(), ticket_rows(25), 'agent@example.com', 10, on_batch=batches.append)
+
+    assert interrupted.value.job['rows_processed'] == 10
+    assert len(batches) == 1
+    assert client.updates == [{'status': 'failed', 'last_error': str(client.error)}]
+
+def test_import_checkpoint_conflict_leaves_the_job_alone():
+    client = FakeClient(fail_on_call=1, error=APIError({'message': 'Import job is at row 10, not 0', 'code': 'PT409'}))
+    with pytest.raises(ImportJobBusy):
+        run_import(client, new_job(), ticket_rows(5), 'agent@example.com', 10)
+    assert client.updates == []
+
+def test_import_resumes_from_the_checkpoint():
+    client = FakeClient()
+    job = run_import(client, {'id': JOB_ID, 'rows_processed': 10}, ticket_rows(25), 'agent@example.com', 10)
+    assert client.calls == 2
+    assert job['status'] == 'completed'
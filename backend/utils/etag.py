@@ -0,0 +1,34 @@
+import hashlib
+import json
+from typing import Any
+from flask import current_app, request
+
+def get_collection_version(client, scope: str) -> int:
+    """Read the change counter the database keeps for a table or per-user scope"""
+    result = client.rpc('get_collection_version', {'p_scope': scope}).execute()
+    return result.data or 0
+
+def make_collection_etag(version: int, *parts: Any) -> str:
+    """
+    Build a strong ETag for a list response
+
+    The collection's change counter is combined with whatever else shapes the
+    response (caller, filters, page), since those vary for one collection.
+    """
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+def is_not_modified(etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    return request.if_none_match.contains(etag.strip('"'))
+
+def not_modified_response(etag: str):
+    """A bodiless 304 for a client whose copy is current"""
+    response = current_app.response_class(status=304)
+    return with_etag(response, etag)
+
+def with_etag(response, etag: str):
+    """Attach an ETag and ask clients to revalidate before reusing the response"""
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
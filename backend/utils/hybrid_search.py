@@ -0,0 +1,28 @@
+from typing import Dict, Hashable, List, Tuple
+
+# Damping constant from the original RRF paper; larger values flatten the
+# advantage of top ranks
+RRF_K = 60
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float, List[str]]]:
+    """
+    Merge several rankings of the same items with reciprocal rank fusion
+
+    Each item scores 1 / (k + rank) in every ranking it appears in, so only
+    ranks matter and scores from different retrievers needn't be comparable.
+
+    Args:
+        rankings: Ranked item IDs, best first, keyed by the retriever's name
+
+    Returns:
+        List[Tuple[Hashable, float, List[str]]]: (item, fused score, retrievers
+        that found it), best first
+    """
+    scores: Dict[Hashable, float] = {}
+    sources: Dict[Hashable, List[str]] = {}
+    for name, ranking in rankings.items():
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+            sources.setdefault(item, []).append(name)
+    fused = sorted(scores, key=lambda item: scores[item], reverse=True)
+    return [(item, scores[item], sources[item]) for item in fused]
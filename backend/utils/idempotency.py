@@ -0,0 +1,210 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from typing import Any, Dict, Optional
+from flask import Response, g, jsonify, make_response, request
+from postgrest import APIError
+from config import Config, logger
+from utils.cache import TTLCache
+from utils.supabase_pool import get_request_client
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Completed responses, so most retries are answered without a database round trip
+response_cache = TTLCache(maxsize=Config.IDEMPOTENCY_CACHE_SIZE, ttl=Config.IDEMPOTENCY_TTL)
+
+def _fingerprint() -> str:
+    """Hash the request body so a reused key with a different request can be rejected"""
+    digest = hashlib.sha256()
+    if request.files:
+        # Multipart boundaries change between retries, so hash the parts instead of the raw body
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{name}={value}\n".encode())
+        for name, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"{name}:{file.filename}\n".encode())
+            digest.update(file.read())
+            file.seek(0)
+    else:
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _claim(user_id: str, endpoint: str, key: str, request_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Reserve an idempotency key for this request
+
+    Returns:
+        dict or None: The existing record if the key was already used, None once reserved.
+            A key that stays contended after the retries counts as in progress.
+    """
+    client = get_request_client()
+
+    for _ in range(2):
+        now = datetime.now(timezone.utc)
+        locked_until = (now + timedelta(seconds=Config.IDEMPOTENCY_LEASE)).isoformat()
+        record = {
+            'user_id': user_id,
+            'endpoint': endpoint,
+            'key': key,
+            'request_hash': request_hash,
+            'locked_until': locked_until,
+            'expires_at': (now + timedelta(seconds=Config.IDEMPOTENCY_TTL)).isoformat()
+        }
+        try:
+            client.table('idempotency_keys').insert(record).execute()
+            return None
+        except APIError as api_e:
+            if api_e.code != '23505':
+                raise
+
+        result = (
+            client
+            .table('idempotency_keys')
+            .select('*')
+            .eq('user_id', user_id)
+            .eq('endpoint', endpoint)
+            .eq('key', key)
+            .execute()
+        )
+        if not result.data:
+            continue
+        existing = result.data[0]
+
+        if datetime.fromisoformat(existing['expires_at']) >= now:
+            # A request whose lease ran out without a response died; take its key over
+            if (
+                existing['status_code'] is None
+                and existing['request_hash'] == request_hash
+                and (existing['locked_until'] is None or datetime.fromisoformat(existing['locked_until']) < now)
+            ):
+                # Only one retry wins: the update matches the lease it saw
+                query = (
+                    client
+                    .table('idempotency_keys')
+                    .update({'locked_until': locked_until})
+                    .eq('user_id', user_id)
+                    .eq('endpoint', endpoint)
+                    .eq('key', key)
+                    .is_('status_code', 'null')
+                )
+                if existing['locked_until'] is None:
+                    query = query.is_('locked_until', 'null')
+                else:
+                    query = query.eq('locked_until', existing['locked_until'])
+                taken = query.execute()
+                if taken.data:
+                    logger.warning(f"Taking over idempotency key {key} for {endpoint} after its lease expired")
+                    return None
+                continue
+            return existing
+
+        # Expired keys can be reused; clear this one and try again
+        (
+            client
+            .table('idempotency_keys')
+            .delete()
+            .eq('user_id', user_id)
+            .eq('endpoint', endpoint)
+            .eq('key', key)
+            .lt('expires_at', now.isoformat())
+            .execute()
+        )
+
+    # Other requests kept winning the key; running the handler now would be unprotected
+    logger.warning(f"Could not reserve idempotency key {key} for {endpoint}")
+    return {'request_hash': request_hash, 'status_code': None}
+
+def _release(user_id: str, endpoint: str, key: str):
+    """Free a reserved key so the request can be retried"""
+    (
+        get_request_client()
+        .table('idempotency_keys')
+        .delete()
+        .eq('user_id', user_id)
+        .eq('endpoint', endpoint)
+        .eq('key', key)
+        .execute()
+    )
+
+def _replay(record: Dict[str, Any]) -> Response:
+    response = Response(
+        record['response_body'],
+        status=record['status_code'],
+        content_type=record['content_type']
+    )
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+def idempotent(f):
+    """
+    Honor the Idempotency-Key header on a write endpoint
+
+    The first request with a key runs normally and its response is stored for
+    IDEMPOTENCY_TTL seconds. Repeats with the same key and body get the stored
+    response back without running the handler. A key reused with a different
+    body is rejected, as is a repeat sent while the first is still running.
+    Server errors aren't stored, so those requests can be retried. A request
+    holds its key for IDEMPOTENCY_LEASE seconds; if it hasn't finished by
+    then its worker is presumed dead and a retry may take the key over.
+
+    Must be applied after the auth decorators, which resolve the caller.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        user = g.get('current_user')
+        if not key or not user:
+            return f(*args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        endpoint = f"{request.method} {request.path}"
+        request_hash = _fingerprint()
+        cache_key = (user['id'], endpoint, key)
+
+        record = response_cache.get(cache_key) or _claim(user['id'], endpoint, key, request_hash)
+        if record:
+            if record['request_hash'] != request_hash:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+            if record['status_code'] is None:
+                return jsonify({'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'}), 409
+            response_cache.set(cache_key, record)
+            return _replay(record)
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            _release(user['id'], endpoint, key)
+            raise
+
+        if response.status_code >= 500:
+            _release(user['id'], endpoint, key)
+            return response
+
+        record = {
+            'request_hash': request_hash,
+            'status_code': response.status_code,
+            'content_type': response.content_type,
+            'response_body': response.get_data(as_text=True),
+            'locked_until': None
+        }
+        try:
+            (
+                get_request_client()
+                .table('idempotency_keys')
+                .update(record)
+                .eq('user_id', user['id'])
+                .eq('endpoint', endpoint)
+                .eq('key', key)
+                .execute()
+            )
+            response_cache.set(cache_key, record)
+        except Exception as e:
+            # The write succeeded; a missing record only means a retry would run it again
+            logger.error(f"Failed to store idempotent response: {str(e)}")
+
+        return response
+
+    return decorated
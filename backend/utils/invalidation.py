@@ -0,0 +1,150 @@
+import atexit
+import json
+import os
+import socket
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+from config import Config, logger
+
+# Datagrams stay far below this; anything larger is not ours
+MAX_MESSAGE_SIZE = 65536
+
+class InvalidationBus:
+    """
+    Broadcasts cache invalidations between the worker processes on one host.
+
+    Every process binds a Unix datagram socket named after its pid in a shared
+    directory. Publishing sends the message to every other socket there, and a
+    listener thread hands received messages to the handlers subscribed to
+    their channel. Sockets left behind by dead workers are removed the first
+    time a send to them fails.
+
+    A peer's socket queues only a few datagrams (net.unix.max_dgram_qlen), so
+    sends go through a socket connected to the peer and wait up to
+    send_timeout seconds for it to drain. Only a peer stuck for that long
+    misses a message, which then leaves an entry stale until its cache TTL
+    expires.
+    """
+
+    def __init__(self, socket_dir: str, send_timeout: float = 0.1):
+        self.socket_dir = socket_dir
+        self.send_timeout = send_timeout
+        self.handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = defaultdict(list)
+        self.socket_path = None
+        self._socket = None
+        self._thread = None
+        self._peers: Dict[str, socket.socket] = {}
+        self._peers_lock = threading.Lock()
+
+    def subscribe(self, channel: str, handler: Callable[[Dict[str, Any]], None]):
+        """Call handler with each message other processes publish on channel"""
+        self.handlers[channel].append(handler)
+
+    def start(self):
+        """Bind this process's socket and start listening; call once per worker"""
+        if self._socket and self.socket_path == self._path_for(os.getpid()):
+            return
+
+        os.makedirs(self.socket_dir, exist_ok=True)
+        self.socket_path = self._path_for(os.getpid())
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.socket_path)
+        # Connections inherited from a parent process belong to it
+        self._peers = {}
+        atexit.register(self._cleanup, self.socket_path)
+
+        self._thread = threading.Thread(target=self._listen, args=(self._socket,), name='invalidation-bus', daemon=True)
+        self._thread.start()
+        logger.info(f"Invalidation bus listening on {self.socket_path}")
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        """Send a message to every other process; local caches are updated by the caller"""
+        if not self._socket:
+            return
+
+        payload = json.dumps({'channel': channel, 'message': message}, separators=(',', ':')).encode()
+        try:
+            names = os.listdir(self.socket_dir)
+        except FileNotFoundError:
+            return
+
+        paths = {
+            os.path.join(self.socket_dir, name)
+            for name in names
+            if name.endswith('.sock')
+        } - {self.socket_path}
+        self._forget_peers(set(self._peers) - paths)
+
+        for path in paths:
+            try:
+                self._send(path, payload)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker that owned this socket is gone
+                self._cleanup(path)
+            except socket.timeout:
+                logger.warning(f"Invalidation dropped; {path} did not drain within {self.send_timeout}s")
+            except OSError as e:
+                self._forget_peers([path])
+                logger.error(f"Failed to send invalidation to {path}: {str(e)}")
+
+    def _send(self, path: str, payload: bytes):
+        """Send through a connection to path, reconnecting once if it went stale"""
+        for attempt in range(2):
+            with self._peers_lock:
+                sock = self._peers.get(path)
+                reused = sock is not None
+                if not reused:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                    sock.settimeout(self.send_timeout)
+                    try:
+                        sock.connect(path)
+                    except OSError:
+                        sock.close()
+                        raise
+                    self._peers[path] = sock
+            try:
+                sock.send(payload)
+                return
+            except (ConnectionRefusedError, FileNotFoundError):
+                self._forget_peers([path])
+                # A new worker may have taken over a dead worker's pid, and its path
+                if not reused or attempt:
+                    raise
+
+    def _forget_peers(self, paths):
+        with self._peers_lock:
+            for path in paths:
+                sock = self._peers.pop(path, None)
+                if sock:
+                    sock.close()
+
+    def _listen(self, sock: socket.socket):
+        while True:
+            try:
+                data = sock.recv(MAX_MESSAGE_SIZE)
+            except OSError:
+                return
+
+            try:
+                envelope = json.loads(data)
+                for handler in self.handlers.get(envelope['channel'], []):
+                    handler(envelope['message'])
+            except Exception as e:
+                logger.error(f"Error handling invalidation: {str(e)}")
+
+    def _path_for(self, pid: int) -> str:
+        return os.path.join(self.socket_dir, f"{pid}.sock")
+
+    @staticmethod
+    def _cleanup(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+# Initialize invalidation bus as a singleton
+invalidation_bus = InvalidationBus(Config.INVALIDATION_SOCKET_DIR, Config.INVALIDATION_SEND_TIMEOUT)
@@ -0,0 +1,92 @@
+import time
+from typing import Any, Dict, Optional
+import jwt
+from jwt import PyJWKClient
+from config import Config, logger
+
+# Asymmetric algorithms Supabase may sign access tokens with when JWKS is enabled
+ASYMMETRIC_ALGORITHMS = ['RS256', 'ES256']
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally instead of asking the auth server.
+
+    Tokens signed with the project's shared secret (HS256) are checked against
+    SUPABASE_JWT_SECRET. Tokens signed with asymmetric keys are checked against
+    the project's JWKS, which is cached and re-fetched when an unknown key id
+    shows up so rotated keys are picked up automatically.
+    """
+
+    def __init__(
+        self,
+        supabase_url: str,
+        jwt_secret: Optional[str] = None,
+        audience: str = 'authenticated',
+        refresh_margin: int = 60,
+        jwks_cache_ttl: int = 600
+    ):
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        if not jwt_secret:
+            # Supabase signs with HS256 unless the project has moved to asymmetric keys
+            logger.warning(
+                "SUPABASE_JWT_SECRET is not set; HS256 access tokens will be checked "
+                "by the auth server on every request, one at a time"
+            )
+        self.refresh_margin = refresh_margin
+
+        # The client only fetches the key set on first use
+        self.jwks_client = PyJWKClient(
+            f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json",
+            cache_keys=True,
+            lifespan=jwks_cache_ttl,
+            timeout=5
+        )
+
+    def _get_key(self, token: str, algorithm: Optional[str]):
+        if algorithm == 'HS256':
+            if not self.jwt_secret:
+                raise jwt.InvalidTokenError('No JWT secret configured for HS256 tokens')
+            return self.jwt_secret
+
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            return self.jwks_client.get_signing_key_from_jwt(token).key
+
+        raise jwt.InvalidAlgorithmError(f'Unsupported token algorithm: {algorithm}')
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token's signature, audience and expiry
+
+        Args:
+            token (str): The raw access token
+
+        Returns:
+            Dict[str, Any]: The decoded token claims
+
+        Raises:
+            jwt.PyJWTError: If the token can't be verified locally
+        """
+        algorithm = jwt.get_unverified_header(token).get('alg')
+        key = self._get_key(token, algorithm)
+
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            options={'require': ['exp', 'sub']}
+        )
+
+    def is_near_expiry(self, claims: Dict[str, Any]) -> bool:
+        """Check whether a verified token is about to expire"""
+        return claims['exp'] - time.time() < self.refresh_margin
+
+# Initialize token verifier as a singleton
+token_verifier = TokenVerifier(
+    Config.SUPABASE_URL,
+    jwt_secret=Config.SUPABASE_JWT_SECRET,
+    audience=Config.JWT_AUDIENCE,
+    refresh_margin=Config.JWT_REFRESH_MARGIN,
+    jwks_cache_ttl=Config.JWKS_CACHE_TTL
+)
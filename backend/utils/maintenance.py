@@ -0,0 +1,87 @@
+import threading
+from typing import Optional
+from config import Config, logger
+from utils.supabase_pool import client_pool
+
+class MaintenanceWorker:
+    """
+    Background thread that prunes tables which only grow.
+
+    Every interval it deletes ticket_events older than the retention period
+    and idempotency keys past their expiry, in batches so no single
+    statement holds locks for long.
+    """
+
+    def __init__(
+        self,
+        service_key: Optional[str],
+        interval: float = 3600,
+        event_retention_days: int = 7,
+        batch_size: int = 5000
+    ):
+        self.service_key = service_key
+        self.interval = interval
+        self.event_retention_days = event_retention_days
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start pruning periodically; safe to call more than once"""
+        if self._thread and self._thread.is_alive():
+            return
+        if not self.service_key:
+            logger.warning("No Supabase service key configured; maintenance worker not started")
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='maintenance', daemon=True)
+        self._thread.start()
+        logger.info("Maintenance worker started")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error running maintenance: {str(e)}")
+            self._stopped.wait(self.interval)
+
+    def _prune(self, function: str, params: dict) -> int:
+        """Call a batched prune function until it runs out of rows"""
+        client = client_pool.get_service_client(self.service_key)
+        total = 0
+        while not self._stopped.is_set():
+            deleted = client.rpc(function, {**params, 'p_batch_size': self.batch_size}).execute().data or 0
+            total += deleted
+            if deleted < self.batch_size:
+                break
+        return total
+
+    def run_once(self) -> int:
+        """
+        Prune everything that is due
+
+        Returns:
+            int: The number of rows deleted
+        """
+        events = self._prune('prune_ticket_events', {'p_older_than': f"{self.event_retention_days} days"})
+        if events:
+            logger.info(f"Pruned {events} ticket events older than {self.event_retention_days} days")
+
+        keys = self._prune('prune_idempotency_keys', {})
+        if keys:
+            logger.info(f"Pruned {keys} expired idempotency keys")
+        return events + keys
+
+# Initialize maintenance worker as a singleton
+maintenance_worker = MaintenanceWorker(
+    Config.SUPABASE_SERVICE_KEY,
+    interval=Config.MAINTENANCE_INTERVAL,
+    event_retention_days=Config.TICKET_EVENTS_RETENTION_DAYS
+)
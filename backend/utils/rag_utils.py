@@ -1,5 +1,6 @@
 import os
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Optional
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_pinecone import PineconeVectorStore
 from langchain_core.prompts import ChatPromptTemplate
@@ -19,6 +20,9 @@ class RAGService:
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4-turbo-preview")
         self.embedding_model = os.getenv("EMBEDDING_MODEL_NAME", "text-embedding-3-small")
+        # Texts sent per embedding request, and how many requests may run at once
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+        self.embedding_concurrency = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
         
         # Initialize Pinecone
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
@@ -196,31 +200,148 @@ class RAGService:
         """
         Upsert tickets to Pinecone
         
+        Each ticket has one vector, keyed by its ID, with a fingerprint of the
+        embedded text in its metadata. Tickets whose text hasn't changed only
+        get their metadata rewritten in one upsert that reuses the stored
+        embeddings. The rest are embedded in batches, with up to
+        embedding_concurrency requests in flight.
+        
         Args:
             tickets: List of dictionaries containing ticket information:
                     [{"content": str, "title": str, "id": str, "metadata": dict}]
         """
-        vectors = []
+        if not tickets:
+            return
         
+        entries = []
         for ticket in tickets:
             full_content = f"Title: {ticket['title']}\n\nContent: {ticket['content']}"
-            embedding = await self.embeddings.aembed_query(full_content)
-            
-            vector = {
-                "id": self._generate_stable_id(full_content, f"ticket_{ticket['id']}"),
-                "values": embedding,
-                "metadata": {
-                    "type": "ticket",
-                    "ticket_id": ticket["id"],
-                    "title": ticket["title"],
-                    "content": ticket["content"],
-                    **ticket.get("metadata", {})
-                }
+            metadata = {
+                "type": "ticket",
+                "ticket_id": ticket["id"],
+                "title": ticket["title"],
+                "content": ticket["content"],
+                "content_hash": hashlib.sha256(full_content.encode()).hexdigest(),
+                **ticket.get("metadata", {})
             }
-            vectors.append(vector)
+            entries.append((f"ticket_{ticket['id']}", full_content, metadata))
+        
+        semaphore = asyncio.Semaphore(self.embedding_concurrency)
+        counts = await asyncio.gather(*[
+            self._upsert_ticket_batch(entries[i:i + self.embedding_batch_size], semaphore)
+            for i in range(0, len(entries), self.embedding_batch_size)
+        ])
         
-        self.index.upsert(vectors=vectors, namespace="breeze_tickets")
-        print(f"Upserted {len(vectors)} tickets to Pinecone")
+        embedded = sum(counts)
+        print(f"Upserted {embedded} tickets to Pinecone, updated metadata for {len(entries) - embedded}")
+    
+    async def _upsert_ticket_batch(self, entries: List[tuple], semaphore: asyncio.Semaphore) -> int:
+        """Upsert one batch of (vector_id, text, metadata) entries, returning how many were embedded"""
+        existing = self.index.fetch(
+            ids=[vector_id for vector_id, _, _ in entries],
+            namespace="breeze_tickets"
+        ).vectors
+        
+        changed, unchanged = [], []
+        for vector_id, full_content, metadata in entries:
+            current = existing.get(vector_id)
+            if current and (current.metadata or {}).get("content_hash") == metadata["content_hash"]:
+                # Reuse the stored embedding; one upsert refreshes every unchanged ticket's metadata
+                unchanged.append({"id": vector_id, "values": current.values, "metadata": metadata})
+            else:
+                changed.append((vector_id, full_content, metadata))
+        
+        if unchanged:
+            self.index.upsert(vectors=unchanged, namespace="breeze_tickets")
+        
+        if not changed:
+            return 0
+        
+        async with semaphore:
+            embeddings = await self.embeddings.aembed_documents(
+                [full_content for _, full_content, _ in changed]
+            )
+        
+        self.index.upsert(
+            vectors=[
+                {"id": vector_id, "values": embedding, "metadata": metadata}
+                for (vector_id, _, metadata), embedding in zip(changed, embeddings)
+            ],
+            namespace="breeze_tickets"
+        )
+        # Vectors used to be keyed by ID and content hash; drop any left for this content
+        self.index.delete(
+            ids=[
+                f"{vector_id}_{metadata['content_hash'][:16]}"
+                for vector_id, _, metadata in changed
+            ],
+            namespace="breeze_tickets"
+        )
+        return len(changed)
+    
+    async def archive_tickets(self, ticket_ids: List[str], policy: str = "move"):
+        """
+        Apply the archive namespace policy to archived tickets' vectors
+        
+        Args:
+            ticket_ids: IDs of the tickets that were archived
+            policy: "move" re-homes the vectors in breeze_tickets_archive, so
+                    they stay searchable on request; "delete" drops them;
+                    "keep" leaves them in breeze_tickets
+        """
+        if policy == "keep" or not ticket_ids:
+            return
+        
+        vector_ids = [f"ticket_{ticket_id}" for ticket_id in ticket_ids]
+        
+        if policy == "move":
+            vectors = self.index.fetch(ids=vector_ids, namespace="breeze_tickets").vectors
+            if vectors:
+                self.index.upsert(
+                    vectors=[
+                        {
+                            "id": vector_id,
+                            "values": vector.values,
+                            "metadata": {**(vector.metadata or {}), "archived": True}
+                        }
+                        for vector_id, vector in vectors.items()
+                    ],
+                    namespace="breeze_tickets_archive"
+                )
+        
+        self.index.delete(ids=vector_ids, namespace="breeze_tickets")
+        print(f"Archived vectors for {len(vector_ids)} tickets with policy {policy}")
+    
+    async def search_tickets(self, question: str, top_k: int = 50, user_email: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Find the tickets most similar to a query
+        
+        Args:
+            question: The search query
+            top_k: How many tickets to return
+            user_email: Only match this customer's tickets
+            
+        Returns:
+            List[Dict[str, Any]]: [{"ticket_id": int, "score": float}], most similar first
+        """
+        embedding = await self.embeddings.aembed_query(question)
+        query_filter = {"type": "ticket"}
+        if user_email:
+            query_filter["user_email"] = {"$eq": user_email}
+        
+        # The Pinecone client is synchronous; keep it off the event loop
+        result = await asyncio.to_thread(
+            self.index.query,
+            vector=embedding,
+            top_k=top_k,
+            filter=query_filter,
+            namespace="breeze_tickets"
+        )
+        return [
+            {"ticket_id": int(match.id.removeprefix("ticket_")), "score": match.score}
+            for match in result.matches
+            if match.id.removeprefix("ticket_").isdigit()
+        ]
     
     async def delete_by_ids(self, ids: List[str], namespace: str):
         """
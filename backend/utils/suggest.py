@@ -0,0 +1,331 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from config import Config, logger
+from utils.cache import TTLCache
+from utils.invalidation import InvalidationBus, invalidation_bus
+from utils.ticket_cache import AGENT_SCOPE, list_scope
+from utils.ticket_query import DEFAULT_SORT, paginate, split_page
+
+# Rows read per round trip when a scope's index is built
+SUGGEST_LOAD_PAGE_SIZE = 1000
+
+# Words of a text that can start a match; later words aren't indexed
+MAX_INDEXED_WORDS = 12
+
+# Index entries read per lookup before ranking, which bounds very short prefixes
+MAX_SCAN = 500
+
+# Seconds before a scope whose build failed is tried again
+BUILD_RETRY_DELAY = 30
+
+# Refresh periods a scope is kept without being asked for
+IDLE_REFRESHES = 4
+
+def normalize(text: str) -> str:
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+class PrefixIndex:
+    """
+    Sorted list of the suffixes of each text that start at a word.
+
+    A prefix lookup is a binary search followed by a scan of the entries
+    sharing the prefix, so "reset" finds "Password reset fails". Not
+    thread-safe; SuggestIndex serializes access.
+    """
+
+    def __init__(self, max_queries: int = 200):
+        self.max_queries = max_queries
+        self._entries: List[Tuple[str, Hashable]] = []
+        self._items: Dict[Hashable, Tuple[str, float, List[str]]] = {}
+        self._queries = OrderedDict()
+
+    @staticmethod
+    def _keys(text: str) -> List[str]:
+        normalized = normalize(text)
+        if not normalized:
+            return []
+        starts = [0] + [m.end() for m in re.finditer(' ', normalized)][:MAX_INDEXED_WORDS - 1]
+        return [normalized[start:] for start in starts]
+
+    def add(self, item: Hashable, text: str, weight: float = 1):
+        self.remove(item)
+        keys = self._keys(text)
+        if not keys:
+            return
+        for key in keys:
+            insort(self._entries, (key, item))
+        self._items[item] = (text, weight, keys)
+
+    def add_many(self, items: Iterable[Tuple[Hashable, str]]):
+        """Index many texts with one sort, instead of an insertion each"""
+        for item, text in items:
+            self.remove(item)
+            keys = self._keys(text)
+            if not keys:
+                continue
+            self._entries.extend((key, item) for key in keys)
+            self._items[item] = (text, 1, keys)
+        self._entries.sort()
+
+    def copy_queries(self, other: 'PrefixIndex'):
+        """Carry recent searches over from the index this one replaces"""
+        for key, count in other._queries.items():
+            self._queries[key] = count
+            text = other._items.get(('query', key), (key,))[0]
+            self.add(('query', key), text, weight=count)
+
+    def remove(self, item: Hashable):
+        entry = self._items.pop(item, None)
+        if not entry:
+            return
+        for key in entry[2]:
+            i = bisect_left(self._entries, (key, item))
+            if i < len(self._entries) and self._entries[i] == (key, item):
+                del self._entries[i]
+
+    def add_query(self, query: str):
+        """Remember a search, ranking it by how often it was made"""
+        key = normalize(query)
+        if not key:
+            return
+        count = self._queries.pop(key, 0) + 1
+        self._queries[key] = count
+        self.add(('query', key), query, weight=count)
+        while len(self._queries) > self.max_queries:
+            oldest, _ = self._queries.popitem(last=False)
+            self.remove(('query', oldest))
+
+    def search(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        seen = {}
+        i = bisect_left(self._entries, (prefix,))
+        end = min(len(self._entries), i + MAX_SCAN)
+        while i < end and self._entries[i][0].startswith(prefix):
+            item = self._entries[i][1]
+            seen[item] = self._items[item]
+            i += 1
+        ranked = sorted(seen.items(), key=lambda entry: (-entry[1][1], len(entry[1][0]), entry[1][0]))
+        return [
+            {'type': kind, 'id': None if kind == 'query' else item_id, 'text': text}
+            for (kind, item_id), (text, _, _) in ranked[:limit]
+        ]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+class _Scope:
+    """A built index and when it was built; stale once a reset makes it incomplete"""
+
+    __slots__ = ('index', 'built_at', 'stale')
+
+    def __init__(self, index: PrefixIndex, stale: bool = False):
+        self.index = index
+        self.built_at = time.monotonic()
+        self.stale = stale
+
+class SuggestIndex:
+    """
+    Autocomplete over ticket titles, knowledge filenames and recent searches.
+
+    There is one PrefixIndex per ticket list scope: agents share one with
+    the newest max_tickets tickets and every knowledge file, each customer
+    gets one with their own. Indexes are kept current by the write paths,
+    here and, through the invalidation bus, in the other workers. Recent
+    searches stay local to the worker that served them.
+
+    Indexes are built in a background thread with the client of the request
+    that first asked for the scope, and rebuilt the same way once they are
+    older than refresh_after seconds or a reset marks them stale. The old
+    index keeps serving meanwhile; until a scope's first build finishes,
+    suggestions come from a small database query. Changes that arrive
+    during a build are queued and applied to the new index before it is
+    served, so they aren't lost to the older snapshot.
+    """
+
+    def __init__(
+        self,
+        max_scopes: int = 200,
+        refresh_after: float = 900,
+        max_tickets: int = 20000,
+        max_queries: int = 200,
+        bus: Optional[InvalidationBus] = None
+    ):
+        # Scopes nobody asked for over a few refresh periods are dropped
+        self.scopes = TTLCache(maxsize=max_scopes, ttl=refresh_after * IDLE_REFRESHES)
+        self.refresh_after = refresh_after
+        self.max_tickets = max_tickets
+        self.max_queries = max_queries
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._failed_at: Dict[str, float] = {}
+        self.bus = bus
+        if bus:
+            bus.subscribe('suggest', self._apply)
+
+    def suggest(self, client, user: Dict[str, Any], prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        entry = self._get_scope(client, user)
+        if entry is None:
+            return self._query(client, user, prefix, limit)
+        with self._lock:
+            return entry.index.search(prefix, limit)
+
+    def record_query(self, user: Dict[str, Any], query: str):
+        """Remember a search in the caller's scope, if this worker has it built"""
+        entry = self.scopes.get(list_scope(user))
+        if entry is None:
+            return
+        with self._lock:
+            entry.index.add_query(query)
+
+    def _get_scope(self, client, user: Dict[str, Any]) -> Optional[_Scope]:
+        """Return the scope's index, starting a build if it is missing, stale or old"""
+        scope = list_scope(user)
+        entry = self.scopes.get(scope)
+        if entry is None or entry.stale or time.monotonic() - entry.built_at > self.refresh_after:
+            self._start_build(scope, client, user)
+        return entry
+
+    def _start_build(self, scope: str, client, user: Dict[str, Any]):
+        with self._lock:
+            if scope in self._pending:
+                return
+            if time.monotonic() - self._failed_at.get(scope, float('-inf')) < BUILD_RETRY_DELAY:
+                return
+            self._pending[scope] = []
+        threading.Thread(
+            target=self._build,
+            args=(scope, client, user),
+            name='suggest-build',
+            daemon=True
+        ).start()
+
+    def _build(self, scope: str, client, user: Dict[str, Any]):
+        index = None
+        try:
+            index = self._load(client, user)
+        except Exception as e:
+            logger.error(f"Failed to build autocomplete index for {scope}: {str(e)}")
+        finally:
+            with self._lock:
+                pending = self._pending.pop(scope)
+                if index is None:
+                    self._failed_at[scope] = time.monotonic()
+                    return
+                self._failed_at.pop(scope, None)
+                for message in pending:
+                    self._apply_to(index, message)
+                previous = self.scopes.get(scope)
+                if previous is not None:
+                    index.copy_queries(previous.index)
+                # After a reset the snapshot may predate the bulk write; serve it but rebuild
+                stale = any(message.get('reset') for message in pending)
+                self.scopes.set(scope, _Scope(index, stale))
+
+    def _load(self, client, user: Dict[str, Any]) -> PrefixIndex:
+        """Build a scope's index from the newest tickets (and files) the caller can see"""
+        index = PrefixIndex(self.max_queries)
+        items = []
+        cursor = None
+        while len(items) < self.max_tickets:
+            query = client.table('tickets').select('id,title,created_at')
+            if user['role'] != 'agent':
+                query = query.eq('user_email', user['email'])
+            page_size = min(SUGGEST_LOAD_PAGE_SIZE, self.max_tickets - len(items))
+            result = paginate(query, cursor, page_size, DEFAULT_SORT).execute()
+            rows, cursor = split_page(result.data or [], page_size, DEFAULT_SORT)
+            items.extend((('ticket', row['id']), row['title']) for row in rows)
+            if not cursor:
+                break
+
+        if user['role'] == 'agent':
+            files = client.table('knowledge_files').select('id,filename').execute().data or []
+            items.extend((('file', row['id']), row['filename']) for row in files)
+
+        index.add_many(items)
+
+        logger.info(f"Built autocomplete index for {list_scope(user)} with {len(index)} entries")
+        return index
+
+    @staticmethod
+    def _query(client, user: Dict[str, Any], prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """Match ticket titles in the database, for a scope whose index isn't built yet"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        pattern = '%' + prefix.replace('_', '\\_').replace(' ', '%') + '%'
+        query = client.table('tickets').select('id,title').ilike('title', pattern)
+        if user['role'] != 'agent':
+            query = query.eq('user_email', user['email'])
+        rows = query.order('created_at', desc=True).limit(limit).execute().data or []
+        return [{'type': 'ticket', 'id': row['id'], 'text': row['title']} for row in rows]
+
+    def ticket_saved(self, ticket: Dict[str, Any]):
+        """Index a new or retitled ticket"""
+        self._publish({'kind': 'ticket', 'id': ticket['id'], 'text': ticket['title'], 'user_email': ticket['user_email']})
+
+    def tickets_removed(self, ticket_ids: List[int]):
+        self._publish({'kind': 'ticket', 'ids': ticket_ids})
+
+    def file_saved(self, file: Dict[str, Any]):
+        self._publish({'kind': 'file', 'id': file['id'], 'text': file['filename']})
+
+    def file_removed(self, file_id: int):
+        self._publish({'kind': 'file', 'ids': [file_id]})
+
+    def reset(self):
+        """Rebuild every index, for writes too large to apply one by one"""
+        self._publish({'reset': True})
+
+    def _publish(self, message: Dict[str, Any]):
+        self._apply(message)
+        if self.bus:
+            self.bus.publish('suggest', message)
+
+    def _apply(self, message: Dict[str, Any]):
+        """Apply a change to the indexes this process has loaded or is loading"""
+        with self._lock:
+            if message.get('reset') or 'ids' in message:
+                for pending in self._pending.values():
+                    pending.append(message)
+                for _, entry in self.scopes.items():
+                    if message.get('reset'):
+                        entry.stale = True
+                    else:
+                        self._apply_to(entry.index, message)
+                return
+
+            scopes = [AGENT_SCOPE]
+            if message['kind'] == 'ticket':
+                scopes.append(f"customer:{message['user_email']}")
+            for scope in scopes:
+                if scope in self._pending:
+                    self._pending[scope].append(message)
+                entry = self.scopes.get(scope)
+                if entry is not None:
+                    self._apply_to(entry.index, message)
+
+    @staticmethod
+    def _apply_to(index: PrefixIndex, message: Dict[str, Any]):
+        if message.get('reset'):
+            return
+        kind = message['kind']
+        if 'ids' in message:
+            for item_id in message['ids']:
+                index.remove((kind, item_id))
+        else:
+            index.add((kind, message['id']), message['text'])
+
+# Initialize autocomplete index as a singleton
+suggest_index = SuggestIndex(
+    max_scopes=Config.SUGGEST_SCOPE_COUNT,
+    refresh_after=Config.SUGGEST_SCOPE_TTL,
+    max_tickets=Config.SUGGEST_MAX_TICKETS,
+    max_queries=Config.SUGGEST_RECENT_QUERIES,
+    bus=invalidation_bus
+)
@@ -0,0 +1,116 @@
+from typing import Optional
+import httpx
+from flask import g
+from postgrest import SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from postgrest.utils import SyncClient
+from config import Config
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """
+    PostgREST client that sends its requests through a shared transport.
+
+    Creating one is cheap: no sockets or TLS contexts are set up, only the
+    headers that identify the caller.
+    """
+
+    def __init__(self, base_url: str, transport: httpx.HTTPTransport, **kwargs):
+        self._transport = transport
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=self._transport,
+            follow_redirects=True
+        )
+
+    def aclose(self) -> None:
+        # The transport is shared with every other client in the pool
+        pass
+
+class SupabaseClientPool:
+    """
+    Hands out per-request PostgREST clients that share one connection pool.
+
+    Each client carries the caller's JWT in its own headers, so concurrent
+    requests on threaded or async workers never share auth state.
+    """
+
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        timeout: float = 30
+    ):
+        self.rest_url = f"{supabase_url.rstrip('/')}/rest/v1"
+        self.supabase_key = supabase_key
+        self.timeout = timeout
+        self.transport = httpx.HTTPTransport(
+            http2=True,
+            retries=1,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            )
+        )
+
+    def get_client(self, access_token: Optional[str] = None) -> PooledPostgrestClient:
+        """
+        Create a client that acts as the given user
+
+        Args:
+            access_token (str, optional): The caller's JWT. The anon key is used when omitted.
+        """
+        headers = {
+            **DEFAULT_POSTGREST_CLIENT_HEADERS,
+            'apikey': self.supabase_key,
+            'Authorization': f"Bearer {access_token or self.supabase_key}"
+        }
+        return PooledPostgrestClient(
+            self.rest_url,
+            self.transport,
+            headers=headers,
+            timeout=self.timeout
+        )
+
+    def get_service_client(self, service_key: str) -> PooledPostgrestClient:
+        """
+        Create a client that bypasses RLS, for background jobs with no user
+
+        Args:
+            service_key (str): The project's service role key
+        """
+        headers = {
+            **DEFAULT_POSTGREST_CLIENT_HEADERS,
+            'apikey': service_key,
+            'Authorization': f"Bearer {service_key}"
+        }
+        return PooledPostgrestClient(
+            self.rest_url,
+            self.transport,
+            headers=headers,
+            timeout=self.timeout
+        )
+
+# Initialize client pool as a singleton
+client_pool = SupabaseClientPool(
+    Config.SUPABASE_URL,
+    Config.SUPABASE_ANON_KEY,
+    max_connections=Config.SUPABASE_POOL_MAX_CONNECTIONS,
+    max_keepalive_connections=Config.SUPABASE_POOL_MAX_KEEPALIVE
+)
+
+def get_request_client() -> PooledPostgrestClient:
+    """
+    Return the PostgREST client for the current request's user.
+
+    Must be called after the auth decorators have resolved the user.
+    """
+    if 'supabase' not in g:
+        g.supabase = client_pool.get_client(g.get('access_token'))
+    return g.supabase
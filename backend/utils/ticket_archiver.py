@@ -0,0 +1,167 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from config import Config, logger
+from utils.rag_utils import rag_service
+from utils.suggest import suggest_index
+from utils.supabase_pool import client_pool
+from utils.ticket_cache import ticket_cache
+from utils.ticket_events import ticket_changes
+
+# Seconds before vectors that failed to archive are tried again
+VECTOR_RETRY_DELAY = 600
+
+class TicketArchiver:
+    """
+    Background thread that moves long-closed tickets to the archive tables.
+
+    Every interval it archives batches through archive_closed_tickets until
+    none are left, then applies the vector namespace policy to the archived
+    tickets and drops them from the ticket caches. Batches lock their rows
+    with SKIP LOCKED, so every worker can run an archiver.
+
+    Archived tickets are queued in archive_vector_queue until their vectors
+    are handled. Vectors that failed, or whose worker died first, are
+    retried at the start of a later run.
+    """
+
+    def __init__(
+        self,
+        service_key: Optional[str],
+        after_days: int = 180,
+        batch_size: int = 500,
+        interval: float = 3600,
+        vector_policy: str = 'move'
+    ):
+        self.service_key = service_key
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.vector_policy = vector_policy
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start archiving periodically; safe to call more than once"""
+        if self._thread and self._thread.is_alive():
+            return
+        if not self.service_key:
+            logger.warning("No Supabase service key configured; ticket archiver not started")
+            return
+        if self.vector_policy not in ('move', 'delete', 'keep'):
+            raise ValueError(f"Unknown archive vector policy: {self.vector_policy}")
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='ticket-archiver', daemon=True)
+        self._thread.start()
+        logger.info("Ticket archiver started")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self.run_once(loop)
+                except Exception as e:
+                    logger.error(f"Error archiving tickets: {str(e)}")
+                self._stopped.wait(self.interval)
+        finally:
+            loop.close()
+
+    def run_once(self, loop: asyncio.AbstractEventLoop) -> int:
+        """
+        Archive every ticket that is due
+
+        Returns:
+            int: The number of tickets archived
+        """
+        client = client_pool.get_service_client(self.service_key)
+        self._retry_vectors(client, loop)
+        total = 0
+
+        while not self._stopped.is_set():
+            archived = client.rpc('archive_closed_tickets', {
+                'p_older_than': f"{self.after_days} days",
+                'p_batch_size': self.batch_size
+            }).execute().data or []
+            if not archived:
+                break
+
+            ticket_ids = [row['archived_id'] for row in archived]
+            ticket_cache.drop_tickets(ticket_ids)
+            ticket_cache.invalidate_lists()
+            suggest_index.tickets_removed(ticket_ids)
+            ticket_changes.notify()
+
+            self._archive_vectors(client, loop, ticket_ids)
+
+            total += len(ticket_ids)
+            if len(ticket_ids) < self.batch_size:
+                break
+
+        if total:
+            logger.info(f"Archived {total} tickets closed more than {self.after_days} days ago")
+        return total
+
+    def _archive_vectors(self, client, loop: asyncio.AbstractEventLoop, ticket_ids: List[int]) -> bool:
+        """Apply the vector policy to archived tickets and dequeue them, or schedule a retry"""
+        try:
+            loop.run_until_complete(
+                rag_service.archive_tickets([str(ticket_id) for ticket_id in ticket_ids], self.vector_policy)
+            )
+        except Exception as e:
+            # The tickets are archived either way; their vectors are retried later
+            logger.error(f"Failed to archive vectors for tickets {ticket_ids}: {str(e)}")
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=VECTOR_RETRY_DELAY)
+            (
+                client
+                .table('archive_vector_queue')
+                .update({'available_at': retry_at.isoformat(), 'last_error': str(e)[:1000]})
+                .in_('ticket_id', ticket_ids)
+                .execute()
+            )
+            return False
+
+        (
+            client
+            .table('archive_vector_queue')
+            .delete()
+            .in_('ticket_id', ticket_ids)
+            .execute()
+        )
+        return True
+
+    def _retry_vectors(self, client, loop: asyncio.AbstractEventLoop):
+        """Handle the vectors of tickets archived on earlier runs that didn't get that far"""
+        while not self._stopped.is_set():
+            rows = (
+                client
+                .table('archive_vector_queue')
+                .select('ticket_id')
+                .lt('available_at', datetime.now(timezone.utc).isoformat())
+                .order('available_at')
+                .limit(self.batch_size)
+                .execute()
+            ).data or []
+            if not rows:
+                return
+
+            ticket_ids = [row['ticket_id'] for row in rows]
+            logger.info(f"Retrying vector archiving for {len(ticket_ids)} tickets")
+            if not self._archive_vectors(client, loop, ticket_ids) or len(ticket_ids) < self.batch_size:
+                return
+
+# Initialize ticket archiver as a singleton
+ticket_archiver = TicketArchiver(
+    Config.SUPABASE_SERVICE_KEY,
+    after_days=Config.ARCHIVE_AFTER_DAYS,
+    batch_size=Config.ARCHIVE_BATCH_SIZE,
+    interval=Config.ARCHIVE_INTERVAL,
+    vector_policy=Config.ARCHIVE_VECTOR_POLICY
+)
@@ -0,0 +1,125 @@
+import json
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+from config import Config
+from utils.cache import TTLCache
+from utils.invalidation import InvalidationBus, invalidation_bus
+
+# Scope shared by every agent, since agents see the same tickets
+AGENT_SCOPE = 'agent'
+
+# Ticket ids per invalidation message, which keeps a datagram well under its size limit
+MAX_IDS_PER_MESSAGE = 1000
+
+def list_scope(user: Dict[str, Any]) -> str:
+    """The list cache scope for a user: shared by agents, per customer otherwise"""
+    return AGENT_SCOPE if user['role'] == 'agent' else f"customer:{user['email']}"
+
+def _pack(value: Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode()
+
+class TicketCache:
+    """
+    Read-through cache for ticket reads.
+
+    Single tickets are stored once by id, with a uuid -> id index, and are
+    shared by all callers; access checks run on the cached row. Ticket lists
+    are cached per scope and normalized query, as the serialized response.
+    Entries are kept as compact JSON bytes rather than dicts to stay small.
+    Writes invalidate the affected ticket and the list scopes that can
+    contain it, here and, through the invalidation bus, in the other workers.
+    The TTLs bound staleness for changes made outside the app.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 300,
+        list_maxsize: int = 1000,
+        list_ttl: float = 30,
+        bus: Optional[InvalidationBus] = None
+    ):
+        self.tickets = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.uuids = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lists = TTLCache(maxsize=list_maxsize, ttl=list_ttl)
+        self.bus = bus
+        if bus:
+            bus.subscribe('tickets', self._apply)
+
+    def get_ticket(self, ticket_id: int) -> Optional[Dict[str, Any]]:
+        packed = self.tickets.get(ticket_id)
+        return json.loads(packed) if packed is not None else None
+
+    def get_ticket_by_uuid(self, ticket_uuid: str) -> Optional[Dict[str, Any]]:
+        ticket_id = self.uuids.get(ticket_uuid)
+        return self.get_ticket(ticket_id) if ticket_id is not None else None
+
+    def set_ticket(self, ticket: Dict[str, Any]):
+        self.tickets.set(ticket['id'], _pack(ticket))
+        self.uuids.set(ticket['uuid'], ticket['id'])
+
+    def get_list(self, scope: str, query: Hashable) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Return the cached (response body, next cursor) for a list query"""
+        return self.lists.get((scope, query))
+
+    def set_list(self, scope: str, query: Hashable, body: bytes, next_cursor: Optional[str]):
+        self.lists.set((scope, query), (body, next_cursor))
+
+    def drop_ticket(self, ticket_id: int):
+        """Drop a single cached ticket; its uuid index entry stays valid"""
+        self._invalidate({'ticket_id': ticket_id})
+
+    def drop_tickets(self, ticket_ids: Iterable[int]):
+        """Drop many cached tickets, with one message per MAX_IDS_PER_MESSAGE"""
+        ticket_ids = list(ticket_ids)
+        for i in range(0, len(ticket_ids), MAX_IDS_PER_MESSAGE):
+            self._invalidate({'ticket_ids': ticket_ids[i:i + MAX_IDS_PER_MESSAGE]})
+
+    def invalidate_ticket(self, ticket_id: int, user_email: Optional[str] = None):
+        """Drop a changed ticket and every list that may contain it"""
+        self._invalidate({'ticket_id': ticket_id, 'lists': True, 'user_email': user_email})
+
+    def invalidate_lists(self, user_email: Optional[str] = None):
+        """
+        Drop cached lists that may contain a ticket owned by user_email
+
+        Those are the agents' lists and the owner's own. Without an owner,
+        every list is dropped.
+        """
+        self._invalidate({'lists': True, 'user_email': user_email})
+
+    def _invalidate(self, message: Dict[str, Any]):
+        self._apply(message)
+        if self.bus:
+            self.bus.publish('tickets', message)
+
+    def _apply(self, message: Dict[str, Any]):
+        """Evict what an invalidation message describes from this process"""
+        if message.get('ticket_id') is not None:
+            self.tickets.delete(message['ticket_id'])
+        for ticket_id in message.get('ticket_ids', []):
+            self.tickets.delete(ticket_id)
+
+        if not message.get('lists'):
+            return
+        if message.get('user_email') is None:
+            self.lists.clear()
+            return
+
+        scopes = {AGENT_SCOPE, f"customer:{message['user_email']}"}
+        self.lists.delete_matching(lambda key: key[0] in scopes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'tickets': self.tickets.stats(),
+            'uuids': self.uuids.stats(),
+            'lists': self.lists.stats()
+        }
+
+# Initialize ticket cache as a singleton
+ticket_cache = TicketCache(
+    maxsize=Config.TICKET_CACHE_SIZE,
+    ttl=Config.TICKET_CACHE_TTL,
+    list_maxsize=Config.TICKET_LIST_CACHE_SIZE,
+    list_ttl=Config.TICKET_LIST_CACHE_TTL,
+    bus=invalidation_bus
+)
@@ -0,0 +1,71 @@
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+from utils.invalidation import InvalidationBus, invalidation_bus
+
+class ChangeSignal:
+    """
+    Wakes up streams waiting for new ticket events.
+
+    Waiters remember the generation they last saw, so a change signalled
+    between polling the database and starting to wait isn't missed. Changes
+    are also broadcast on the invalidation bus to wake streams in the other
+    workers.
+    """
+
+    def __init__(self, bus: Optional[InvalidationBus] = None):
+        self._condition = threading.Condition()
+        self._generation = 0
+        self.bus = bus
+        if bus:
+            bus.subscribe('ticket_events', lambda message: self._notify())
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def notify(self):
+        """Signal that ticket events were written, in this worker and the others"""
+        self._notify()
+        if self.bus:
+            self.bus.publish('ticket_events', {})
+
+    def _notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation: int, timeout: float) -> bool:
+        """
+        Wait until something changes after the given generation
+
+        Returns:
+            bool: False if the timeout passed without a change
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._generation != generation, timeout)
+
+def event_position(event: Dict[str, Any]) -> Tuple[str, int]:
+    """The stream position after an event: its transaction id and event id"""
+    return event['txid'], event['id']
+
+def format_position(position: Tuple[str, int]) -> str:
+    return f"{position[0]}-{position[1]}"
+
+def parse_position(value: str) -> Tuple[str, int]:
+    """Parse a Last-Event-ID back into a stream position, raising ValueError if malformed"""
+    txid, event_id = value.split('-')
+    return str(int(txid)), int(event_id)
+
+def format_event(event: Dict[str, Any]) -> str:
+    """Render a ticket_events row as a server-sent event"""
+    data = json.dumps({
+        'ticket_id': event['ticket_id'],
+        'ticket_uuid': event['ticket_uuid'],
+        'created_at': event['created_at'],
+        **event['payload']
+    }, separators=(',', ':'))
+    return f"id: {format_position(event_position(event))}\nevent: {event['event_type']}\ndata: {data}\n\n"
+
+# Initialize change signal as a singleton
+ticket_changes = ChangeSignal(bus=invalidation_bus)
@@ -0,0 +1,29 @@
+import csv
+import io
+import json
+from typing import Any, Dict, List
+
+# Formats the export can stream, with their content types
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def ndjson_line(row: Dict[str, Any]) -> str:
+    return json.dumps(row, separators=(',', ':'), default=str) + '\n'
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        # Same list syntax the bulk import accepts
+        return ';'.join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(',', ':'), default=str)
+    return value
+
+def csv_line(values: List[Any]) -> str:
+    """Render one CSV record, quoting like csv.writer does"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([_csv_value(value) for value in values])
+    return buffer.getvalue()
@@ -0,0 +1,216 @@
+import csv
+import io
+import json
+import traceback
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from postgrest import APIError
+from config import logger
+from utils.ticket_query import TICKET_STATUSES
+
+# Source formats accepted by the bulk import, keyed by content type
+IMPORT_CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv'
+}
+
+class ImportRowError(ValueError):
+    """Raised when a single imported row can't be turned into a ticket"""
+    pass
+
+class ImportJobBusy(Exception):
+    """Raised when another upload of the same job moved its checkpoint first"""
+    pass
+
+class ImportInterrupted(Exception):
+    """Raised when an import stops partway; job holds the checkpoint to resume from"""
+
+    def __init__(self, job: Dict[str, Any], error: Exception):
+        super().__init__(str(error))
+        self.job = job
+
+def detect_format(content_type: str, requested: str = None) -> str:
+    """Work out the import format from a format= parameter or the request's content type"""
+    if requested:
+        if requested not in IMPORT_CONTENT_TYPES.values():
+            raise ValueError(f"Unsupported import format: {requested}")
+        return requested
+
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype not in IMPORT_CONTENT_TYPES:
+        raise ValueError('Send NDJSON (application/x-ndjson) or CSV (text/csv)')
+    return IMPORT_CONTENT_TYPES[mimetype]
+
+def iter_rows(stream, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Read an upload one row at a time without buffering it
+
+    Yields (row number, row) pairs. A row that can't be parsed is yielded as
+    an ImportRowError so it's reported without stopping the import.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text)):
+            yield number, row
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError('Each line must be a JSON object')
+            yield number, row
+        except ValueError as e:
+            yield number, ImportRowError(f"Invalid JSON: {str(e)}")
+        number += 1
+
+def _parse_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    # CSV cells hold lists as "a;b" or "a,b"
+    return [item.strip() for item in str(value).replace(';', ',').split(',') if item.strip()]
+
+def _text(row: Dict[str, Any], field: str) -> str:
+    """Read a scalar field as stripped text; JSON numbers and booleans are accepted"""
+    value = row.get(field)
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        raise ImportRowError(f"{field} must be a string")
+    return str(value).strip()
+
+def normalize_row(row: Dict[str, Any], job_id: str, number: int, default_email: str) -> Dict[str, Any]:
+    """
+    Map one source row onto the ticket columns import_ticket_batch inserts
+
+    Rows without a uuid get one derived from the job and row number, so
+    replaying a batch after an interruption can't create duplicates.
+    """
+    title = _text(row, 'title')
+    description = _text(row, 'description')
+    if not title or not description:
+        raise ImportRowError('Title and description are required')
+
+    status = _text(row, 'status') or 'open'
+    if status not in TICKET_STATUSES:
+        raise ImportRowError(f"Unknown status: {status}")
+
+    source_uuid = _text(row, 'uuid')
+    try:
+        ticket_uuid = str(uuid.UUID(source_uuid)) if source_uuid else str(uuid.uuid5(uuid.UUID(job_id), str(number)))
+    except ValueError:
+        raise ImportRowError(f"Invalid uuid: {source_uuid}")
+
+    created_at = None
+    if row.get('created_at'):
+        if isinstance(row['created_at'], (dict, list)):
+            raise ImportRowError('created_at must be an ISO 8601 timestamp')
+        try:
+            created_at = datetime.fromisoformat(str(row['created_at'])).isoformat()
+        except ValueError:
+            raise ImportRowError('created_at must be an ISO 8601 timestamp')
+
+    user_email = _text(row, 'user_email') or default_email
+    return {
+        'uuid': ticket_uuid,
+        'title': title,
+        'description': description,
+        'status': status,
+        'user_email': user_email,
+        'username': _text(row, 'username') or user_email,
+        'created_at': created_at,
+        'assignee': _parse_list(row.get('assignee'))
+    }
+
+def _import_batch(client, job, batch, errors, row_count) -> Dict[str, Any]:
+    """Insert one batch of imported tickets and advance the job's checkpoint"""
+    job = (
+        client
+        .rpc('import_ticket_batch', {
+            'p_job_id': job['id'],
+            'p_offset': job['rows_processed'],
+            'p_row_count': row_count,
+            'p_rows': batch,
+            'p_errors': errors
+        })
+        .execute()
+    ).data[0]
+    logger.info(f"Import job {job['id']}: {job['rows_processed']} rows processed, {job['inserted']} inserted")
+    return job
+
+def run_import(
+    client,
+    job: Dict[str, Any],
+    rows: Iterable[Tuple[int, Any]],
+    default_email: str,
+    batch_size: int,
+    on_batch: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Insert an upload's rows into an import job and mark it completed
+
+    Rows before the job's checkpoint are skipped. Rows are inserted in
+    batches of batch_size, each advancing the checkpoint, and on_batch is
+    called with the job after each one.
+
+    Raises:
+        ImportJobBusy: Another upload of the job is ahead of this one
+        ImportInterrupted: Anything else stopped the import; the job is marked failed
+    """
+    resume_from = job['rows_processed']
+    batch, errors, row_count = [], [], 0
+    try:
+        for number, row in rows:
+            if number < resume_from:
+                continue
+
+            row_count += 1
+            try:
+                if isinstance(row, ImportRowError):
+                    raise row
+                batch.append(normalize_row(row, job['id'], number, default_email))
+            except ImportRowError as e:
+                errors.append({'row': number, 'error': str(e)})
+
+            if row_count >= batch_size:
+                job = _import_batch(client, job, batch, errors, row_count)
+                batch, errors, row_count = [], [], 0
+                if on_batch:
+                    on_batch(job)
+
+        if row_count:
+            job = _import_batch(client, job, batch, errors, row_count)
+            if on_batch:
+                on_batch(job)
+
+        return (
+            client
+            .table('import_jobs')
+            .update({'status': 'completed', 'last_error': None})
+            .eq('id', job['id'])
+            .execute()
+        ).data[0]
+    except Exception as e:
+        if isinstance(e, APIError) and e.code == 'PT409':
+            raise ImportJobBusy(str(e))
+        logger.error(f"Import job {job['id']} stopped at row {job['rows_processed']}: {str(e)}")
+        logger.error(traceback.format_exc())
+        error = e
+
+    try:
+        client.table('import_jobs').update({
+            'status': 'failed',
+            'last_error': str(error)
+        }).eq('id', job['id']).execute()
+    except Exception as e:
+        # The checkpoint is already saved; only the status is out of date
+        logger.error(f"Failed to mark import job {job['id']} as failed: {str(e)}")
+    raise ImportInterrupted(job, error)
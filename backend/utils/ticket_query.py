@@ -0,0 +1,231 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Columns clients may request through the fields= parameter
+TICKET_FIELDS = [
+    'id', 'uuid', 'title', 'description', 'status', 'user_email', 'username',
+    'created_at', 'assignee', 'related_uuids', 'response_count', 'latest_response'
+]
+
+# Columns every page needs to build its next cursor
+CURSOR_FIELDS = ['id', 'created_at']
+
+# Columns the list can be sorted by; id is always the tie breaker
+SORTABLE_FIELDS = ['created_at', 'id', 'status', 'title', 'user_email']
+DEFAULT_SORT = '-created_at'
+
+TICKET_STATUSES = ['open', 'in_progress', 'resolved', 'closed']
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Views that add archived rows to the hot tables, for include_archived reads
+TICKETS_WITH_ARCHIVE = 'tickets_with_archive'
+RESPONSES_WITH_ARCHIVE = 'ticket_responses_with_archive'
+
+class QueryError(ValueError):
+    """Raised when list query parameters are invalid"""
+    pass
+
+def parse_fields(fields: Optional[str], sort: str = DEFAULT_SORT) -> Optional[List[str]]:
+    """
+    Parse a comma separated fields= parameter into a column list
+
+    Args:
+        fields (str, optional): The raw parameter value
+        sort (str): The sort in effect; its column is needed to build cursors
+
+    Returns:
+        List[str] or None: The selected columns, or None when all columns are wanted
+    """
+    if not fields:
+        return None
+
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in TICKET_FIELDS]
+    if unknown:
+        raise QueryError(f"Unknown fields: {', '.join(unknown)}")
+
+    selected = list(CURSOR_FIELDS)
+    sort_field = sort.lstrip('-')
+    if sort_field not in selected:
+        selected.append(sort_field)
+    selected.extend(field for field in requested if field not in selected)
+    return selected
+
+def parse_limit(limit: Optional[str]) -> Optional[int]:
+    """Parse the limit= parameter, capping it at MAX_PAGE_SIZE"""
+    if limit is None:
+        return None
+
+    try:
+        value = int(limit)
+    except ValueError:
+        raise QueryError('limit must be an integer')
+
+    if value < 1:
+        raise QueryError('limit must be positive')
+    return min(value, MAX_PAGE_SIZE)
+
+def parse_sort(sort: Optional[str]) -> str:
+    """
+    Validate a sort= parameter such as "-created_at" (descending) or "title"
+    """
+    sort = (sort or DEFAULT_SORT).strip()
+    if sort.lstrip('-') not in SORTABLE_FIELDS:
+        raise QueryError(f"Cannot sort by {sort.lstrip('-')}")
+    return sort
+
+def parse_flag(value: Optional[str]) -> bool:
+    """Parse a boolean query parameter such as include_archived=true"""
+    return (value or '').strip().lower() in ('1', 'true', 'yes')
+
+def ticket_table(include_archived: bool = False) -> str:
+    """The relation ticket reads should query"""
+    return TICKETS_WITH_ARCHIVE if include_archived else 'tickets'
+
+def _split_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+def _parse_timestamp(value: str, name: str) -> str:
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise QueryError(f"{name} must be an ISO 8601 timestamp")
+
+def parse_filters(args: Mapping[str, str], current_user: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Parse ticket list filters from query parameters
+
+    Supported parameters:
+        status: Comma separated statuses, e.g. "open,in_progress"
+        assignee: Comma separated agent IDs the ticket must be assigned to; "me" is the caller
+        created_after / created_before: ISO 8601 bounds on created_at
+        user_email: The ticket author's email
+        q: Free text matched against title and description
+        sort: Column to sort by, prefixed with "-" for descending
+        include_archived: Also return archived tickets
+
+    Args:
+        args: The request's query parameters
+        current_user (dict, optional): The resolved caller, used to expand "me"
+
+    Returns:
+        Dict[str, Any]: Normalized filters for apply_filters
+    """
+    filters = {'sort': parse_sort(args.get('sort'))}
+
+    statuses = _split_list(args.get('status'))
+    unknown = [status for status in statuses if status not in TICKET_STATUSES]
+    if unknown:
+        raise QueryError(f"Unknown status: {', '.join(unknown)}")
+    if statuses:
+        filters['status'] = statuses
+
+    assignees = _split_list(args.get('assignee'))
+    if assignees:
+        if 'me' in assignees and not current_user:
+            raise QueryError('assignee=me requires an authenticated user')
+        filters['assignee'] = [
+            current_user['id'] if assignee == 'me' else assignee
+            for assignee in assignees
+        ]
+
+    if args.get('created_after'):
+        filters['created_after'] = _parse_timestamp(args['created_after'], 'created_after')
+    if args.get('created_before'):
+        filters['created_before'] = _parse_timestamp(args['created_before'], 'created_before')
+
+    if args.get('user_email'):
+        filters['user_email'] = args['user_email'].strip()
+
+    if args.get('q', '').strip():
+        filters['q'] = args['q'].strip()
+
+    if parse_flag(args.get('include_archived')):
+        filters['include_archived'] = True
+
+    return filters
+
+def apply_filters(query, filters: Dict[str, Any]):
+    """Push parsed filters down to a PostgREST ticket query"""
+    if 'status' in filters:
+        query = query.in_('status', filters['status'])
+    if 'assignee' in filters:
+        # Uses the GIN index on the assignee array
+        query = query.contains('assignee', filters['assignee'])
+    if 'created_after' in filters:
+        query = query.gte('created_at', filters['created_after'])
+    if 'created_before' in filters:
+        query = query.lt('created_at', filters['created_before'])
+    if 'user_email' in filters:
+        query = query.eq('user_email', filters['user_email'])
+    if 'q' in filters:
+        pattern = quote_value(f"*{filters['q']}*")
+        query = query.or_(f"title.ilike.{pattern},description.ilike.{pattern}")
+    return query
+
+def encode_cursor(ticket: Dict[str, Any], sort: str = DEFAULT_SORT) -> str:
+    """Build an opaque cursor pointing just past the given ticket"""
+    payload = json.dumps([ticket[sort.lstrip('-')], ticket['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor into (sort value, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, ticket_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(ticket_id)
+    except Exception:
+        raise QueryError('Invalid cursor')
+
+def quote_value(value: Any) -> str:
+    """Quote a value for use inside a PostgREST logic tree such as or=(...)"""
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+def apply_cursor(query, cursor: str, sort: str = DEFAULT_SORT):
+    """
+    Restrict a query ordered by (sort column, id) to rows after the cursor
+    """
+    value, ticket_id = decode_cursor(cursor)
+    field = sort.lstrip('-')
+    op = 'lt' if sort.startswith('-') else 'gt'
+
+    if field == 'id':
+        return query.filter('id', op, str(ticket_id))
+
+    value = quote_value(value)
+    return query.or_(
+        f"{field}.{op}.{value},and({field}.eq.{value},id.{op}.{ticket_id})"
+    )
+
+def paginate(query, cursor: Optional[str], limit: Optional[int], sort: str = DEFAULT_SORT):
+    """
+    Apply keyset ordering, the cursor and the page size to a ticket query
+
+    One extra row is requested so callers can tell whether another page exists.
+    """
+    if cursor:
+        query = apply_cursor(query, cursor, sort)
+    desc = sort.startswith('-')
+    field = sort.lstrip('-')
+    query = query.order(field, desc=desc)
+    if field != 'id':
+        query = query.order('id', desc=desc)
+    if limit:
+        query = query.limit(limit + 1)
+    return query
+
+def split_page(
+    rows: List[Dict[str, Any]],
+    limit: Optional[int],
+    sort: str = DEFAULT_SORT
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the extra row fetched by paginate and return (rows, next_cursor)"""
+    if not limit or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1], sort)
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+from config import Config, logger
+from utils.rag_utils import rag_service
+from utils.supabase_pool import client_pool
+
+def build_ticket_document(ticket: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a ticket row into the document format rag_service.upsert_tickets expects"""
+    return {
+        'id': str(ticket['id']),
+        'uuid': ticket['uuid'],
+        'title': ticket['title'],
+        'content': ticket['description'],
+        'metadata': {
+            'user_email': ticket['user_email'],
+            'status': ticket['status'],
+            'created_at': ticket['created_at'],
+            'updated_at': ticket.get('updated_at') or ticket['created_at'],
+            'uuid': ticket['uuid'],
+            'username': ticket['username'],
+            'assignee': ticket.get('assignee') or [],
+            'response_count': ticket.get('response_count', 0),
+            'related_uuids': ticket.get('related_uuids') or []
+        }
+    }
+
+class VectorOutboxWorker:
+    """
+    Background thread that keeps the ticket vectors in sync with the database.
+
+    Ticket writes are queued in the vector_outbox table by a trigger, one row
+    per ticket, so several edits in a row are embedded only once. The worker
+    leases due rows in batches, re-reads the current tickets, upserts them and
+    removes the rows. Failed batches are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        service_key: Optional[str],
+        batch_size: int = 200,
+        poll_interval: float = 2,
+        lease_seconds: int = 120,
+        base_retry_delay: int = 5,
+        max_retry_delay: int = 900
+    ):
+        self.service_key = service_key
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.base_retry_delay = base_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._loop = None
+
+    def start(self):
+        """Start draining the outbox; safe to call more than once"""
+        if self._thread and self._thread.is_alive():
+            return
+        if not self.service_key:
+            logger.warning("No Supabase service key configured; vector outbox worker not started")
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='vector-outbox', daemon=True)
+        self._thread.start()
+        logger.info("Vector outbox worker started")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """Ask the worker to check the outbox now instead of at its next poll"""
+        self._wakeup.set()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    processed = self.drain_once()
+                except Exception as e:
+                    logger.error(f"Error draining vector outbox: {str(e)}")
+                    processed = 0
+
+                # Keep going while there's a backlog, otherwise sleep until woken or polled
+                if processed < self.batch_size:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+        finally:
+            self._loop.close()
+
+    def drain_once(self) -> int:
+        """
+        Process one batch of due outbox entries
+
+        Returns:
+            int: The number of entries claimed
+        """
+        client = client_pool.get_service_client(self.service_key)
+
+        entries = client.rpc('claim_vector_outbox', {
+            'p_batch_size': self.batch_size,
+            'p_lease_seconds': self.lease_seconds
+        }).execute().data or []
+        if not entries:
+            return 0
+
+        ticket_ids = [entry['ticket_id'] for entry in entries]
+        try:
+            tickets = (
+                client
+                .table('tickets')
+                .select('*')
+                .in_('id', ticket_ids)
+                .execute()
+            ).data or []
+
+            if tickets:
+                self._loop.run_until_complete(
+                    rag_service.upsert_tickets([build_ticket_document(ticket) for ticket in tickets])
+                )
+        except Exception as e:
+            logger.error(f"Failed to index tickets {ticket_ids}: {str(e)}")
+            client.rpc('fail_vector_outbox', {
+                'p_ticket_ids': ticket_ids,
+                'p_error': str(e)[:1000],
+                'p_base_delay_seconds': self.base_retry_delay,
+                'p_max_delay_seconds': self.max_retry_delay
+            }).execute()
+            return len(entries)
+
+        # Entries re-enqueued while we were indexing keep their newer timestamp and stay queued
+        client.rpc('complete_vector_outbox', {
+            'p_entries': [
+                {'ticket_id': entry['ticket_id'], 'enqueued_at': entry['enqueued_at']}
+                for entry in entries
+            ]
+        }).execute()
+        logger.info(f"Indexed {len(tickets)} tickets from the vector outbox")
+        return len(entries)
+
+# Initialize outbox worker as a singleton
+outbox_worker = VectorOutboxWorker(
+    Config.SUPABASE_SERVICE_KEY,
+    batch_size=Config.VECTOR_OUTBOX_BATCH_SIZE,
+    poll_interval=Config.VECTOR_OUTBOX_POLL_INTERVAL,
+    lease_seconds=Config.VECTOR_OUTBOX_LEASE_SECONDS,
+    max_retry_delay=Config.VECTOR_OUTBOX_MAX_RETRY_DELAY
+)
@@ -103,6 +103,8 @@ start_supabase() {
     export SUPABASE_LOCAL_URL="http://localhost:54321"
     export SUPABASE_LOCAL_ANON_KEY=$(supabase status | grep anon | awk '{print $4}')
     export SUPABASE_LOCAL_SERVICE_KEY=$(supabase status | grep service_role | awk '{print $4}')
+    # Lets the backend verify access tokens without calling the auth server
+    export SUPABASE_LOCAL_JWT_SECRET=$(supabase status | grep 'JWT secret' | awk '{print $3}')
     
     # Update .env file with local credentials
     if [ ! -f .env ]; then
@@ -113,11 +115,13 @@ start_supabase() {
     sed -i.bak '/SUPABASE_LOCAL_URL/d' .env
     sed -i.bak '/SUPABASE_LOCAL_ANON_KEY/d' .env
     sed -i.bak '/SUPABASE_LOCAL_SERVICE_KEY/d' .env
+    sed -i.bak '/SUPABASE_LOCAL_JWT_SECRET/d' .env
     sed -i.bak '/IS_LOCAL/d' .env
     
     echo "SUPABASE_LOCAL_URL=$SUPABASE_LOCAL_URL" >> .env
     echo "SUPABASE_LOCAL_ANON_KEY=$SUPABASE_LOCAL_ANON_KEY" >> .env
     echo "SUPABASE_LOCAL_SERVICE_KEY=$SUPABASE_LOCAL_SERVICE_KEY" >> .env
+    echo "SUPABASE_LOCAL_JWT_SECRET=$SUPABASE_LOCAL_JWT_SECRET" >> .env
     echo "IS_LOCAL=true" >> .env
     
     rm -f .env.bak
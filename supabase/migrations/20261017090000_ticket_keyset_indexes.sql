@@ -0,0 +1,7 @@
+-- Indexes backing keyset pagination on GET /tickets, ordered by (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_tickets_created_at_id
+    ON public.tickets(created_at DESC, id DESC);
+
+-- Customers page through their own tickets only
+CREATE INDEX IF NOT EXISTS idx_tickets_user_email_created_at_id
+    ON public.tickets(user_email, created_at DESC, id DESC);
@@ -0,0 +1,16 @@
+-- Indexes backing the server-side filters on GET /tickets
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- assignee=<id> filters use array containment (@>)
+CREATE INDEX IF NOT EXISTS idx_tickets_assignee
+    ON public.tickets USING GIN (assignee);
+
+-- status filters combined with the default created_at ordering
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created_at_id
+    ON public.tickets(status, created_at DESC, id DESC);
+
+-- Free text q= filters use ilike with leading wildcards
+CREATE INDEX IF NOT EXISTS idx_tickets_title_trgm
+    ON public.tickets USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_tickets_description_trgm
+    ON public.tickets USING GIN (description gin_trgm_ops);
@@ -0,0 +1,4 @@
+-- Related ticket lookups match on either side of the relationship.
+-- UNIQUE(uuid_1, uuid_2) already covers uuid_1.
+CREATE INDEX IF NOT EXISTS idx_ticket_relationships_uuid_2
+    ON public.ticket_relationships(uuid_2);
@@ -0,0 +1,111 @@
+-- Connected components of ticket_relationships, so a whole incident cluster
+-- can be read with one indexed lookup instead of walking links hop by hop.
+CREATE TABLE IF NOT EXISTS public.ticket_clusters (
+    ticket_uuid UUID PRIMARY KEY,
+    cluster_id UUID NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_clusters_cluster_id ON public.ticket_clusters(cluster_id);
+
+-- Union two tickets' clusters. The smaller cluster is relabelled into the
+-- larger one (union by size), so each ticket is relabelled O(log n) times.
+CREATE OR REPLACE FUNCTION merge_ticket_clusters(p_uuid_1 UUID, p_uuid_2 UUID)
+RETURNS UUID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_cluster_1 UUID;
+    v_cluster_2 UUID;
+    v_size_1 BIGINT;
+    v_size_2 BIGINT;
+BEGIN
+    -- Merges are rare; serialize them so concurrent links can't split a cluster
+    PERFORM pg_advisory_xact_lock(hashtext('ticket_clusters'));
+
+    INSERT INTO ticket_clusters (ticket_uuid, cluster_id)
+    VALUES (p_uuid_1, p_uuid_1), (p_uuid_2, p_uuid_2)
+    ON CONFLICT (ticket_uuid) DO NOTHING;
+
+    SELECT cluster_id INTO v_cluster_1 FROM ticket_clusters WHERE ticket_uuid = p_uuid_1;
+    SELECT cluster_id INTO v_cluster_2 FROM ticket_clusters WHERE ticket_uuid = p_uuid_2;
+
+    IF v_cluster_1 = v_cluster_2 THEN
+        RETURN v_cluster_1;
+    END IF;
+
+    SELECT count(*) INTO v_size_1 FROM ticket_clusters WHERE cluster_id = v_cluster_1;
+    SELECT count(*) INTO v_size_2 FROM ticket_clusters WHERE cluster_id = v_cluster_2;
+
+    IF v_size_1 >= v_size_2 THEN
+        UPDATE ticket_clusters SET cluster_id = v_cluster_1 WHERE cluster_id = v_cluster_2;
+        RETURN v_cluster_1;
+    END IF;
+
+    UPDATE ticket_clusters SET cluster_id = v_cluster_2 WHERE cluster_id = v_cluster_1;
+    RETURN v_cluster_2;
+END;
+$$;
+
+-- Only the trigger below merges clusters
+REVOKE EXECUTE ON FUNCTION merge_ticket_clusters(UUID, UUID) FROM PUBLIC, anon, authenticated;
+
+-- Keep clusters up to date as tickets are linked
+CREATE OR REPLACE FUNCTION ticket_relationships_merge_clusters()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM merge_ticket_clusters(NEW.uuid_1, NEW.uuid_2);
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER merge_ticket_clusters_on_link
+    AFTER INSERT ON public.ticket_relationships
+    FOR EACH ROW
+    EXECUTE FUNCTION ticket_relationships_merge_clusters();
+
+-- All tickets in the same cluster as the given ticket. Runs as the caller so
+-- the tickets RLS policies still apply.
+CREATE OR REPLACE FUNCTION get_ticket_cluster(p_ticket_id INTEGER)
+RETURNS SETOF public.tickets
+LANGUAGE SQL
+STABLE
+AS $$
+    SELECT t.*
+    FROM public.tickets t
+    JOIN public.ticket_clusters c ON c.ticket_uuid = t.uuid
+    WHERE c.cluster_id = (
+        SELECT tc.cluster_id
+        FROM public.ticket_clusters tc
+        JOIN public.tickets s ON s.uuid = tc.ticket_uuid
+        WHERE s.id = p_ticket_id
+    )
+    ORDER BY t.created_at DESC, t.id DESC;
+$$;
+
+-- Backfill clusters from the existing relationships
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN SELECT uuid_1, uuid_2 FROM public.ticket_relationships ORDER BY id LOOP
+        PERFORM merge_ticket_clusters(r.uuid_1, r.uuid_2);
+    END LOOP;
+END;
+$$;
+
+ALTER TABLE public.ticket_clusters ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view ticket clusters"
+    ON public.ticket_clusters FOR SELECT
+    USING (EXISTS (
+        SELECT 1 FROM public.tickets t
+        WHERE t.uuid = ticket_uuid
+        AND (t.user_email = auth.uid()::text OR
+             EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'))
+    ));
@@ -0,0 +1,63 @@
+-- Link a ticket to one or more related tickets in a single transaction.
+-- Access is checked against the caller's profile, links the caller can't see
+-- are reported as missing, and existing links (in either direction) are kept.
+CREATE OR REPLACE FUNCTION link_tickets(p_ticket_id INTEGER, p_related_uuids UUID[])
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_role TEXT;
+    v_email TEXT;
+    v_ticket public.tickets%ROWTYPE;
+    v_visible UUID[];
+BEGIN
+    SELECT role, email INTO v_role, v_email FROM public.profiles WHERE id = auth.uid();
+
+    IF v_role IS NULL THEN
+        RAISE EXCEPTION 'User profile not found' USING ERRCODE = 'PT403';
+    END IF;
+
+    SELECT * INTO v_ticket
+    FROM public.tickets
+    WHERE id = p_ticket_id
+    AND (v_role = 'agent' OR user_email = v_email);
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Ticket not found or access denied' USING ERRCODE = 'PT404';
+    END IF;
+
+    SELECT coalesce(array_agg(t.uuid), ARRAY[]::UUID[]) INTO v_visible
+    FROM public.tickets t
+    WHERE t.uuid = ANY(p_related_uuids)
+    AND t.uuid <> v_ticket.uuid
+    AND (v_role = 'agent' OR t.user_email = v_email);
+
+    INSERT INTO public.ticket_relationships (uuid_1, uuid_2, created_at, created_by)
+    SELECT v_ticket.uuid, related_uuid, CURRENT_TIMESTAMP, v_email
+    FROM unnest(v_visible) AS related_uuid
+    WHERE NOT EXISTS (
+        SELECT 1 FROM public.ticket_relationships r
+        WHERE r.uuid_1 = related_uuid AND r.uuid_2 = v_ticket.uuid
+    )
+    ON CONFLICT (uuid_1, uuid_2) DO NOTHING;
+
+    RETURN jsonb_build_object(
+        'ticket', to_jsonb(v_ticket),
+        'linked', (
+            SELECT coalesce(jsonb_agg(to_jsonb(t)), '[]'::JSONB)
+            FROM public.tickets t
+            WHERE t.uuid = ANY(v_visible)
+        ),
+        'missing', (
+            SELECT coalesce(jsonb_agg(requested), '[]'::JSONB)
+            FROM unnest(p_related_uuids) AS requested
+            WHERE requested <> ALL(v_visible)
+        )
+    );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION link_tickets(INTEGER, UUID[]) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION link_tickets(INTEGER, UUID[]) TO authenticated;
@@ -0,0 +1,73 @@
+-- Append-only store for ticket responses. Replies are single-row inserts
+-- instead of rewrites of the tickets.responses JSONB array.
+CREATE TABLE IF NOT EXISTS public.ticket_responses (
+    id BIGSERIAL PRIMARY KEY,
+    ticket_id INTEGER NOT NULL REFERENCES public.tickets(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    user_email TEXT NOT NULL,
+    username TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_responses_ticket_id_id
+    ON public.ticket_responses(ticket_id, id);
+
+-- Tickets carry a summary so list payloads don't need the full history
+ALTER TABLE public.tickets
+    ADD COLUMN IF NOT EXISTS response_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS latest_response JSONB;
+
+CREATE OR REPLACE FUNCTION ticket_responses_update_summary()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    UPDATE public.tickets
+    SET response_count = response_count + 1,
+        latest_response = jsonb_build_object(
+            'id', NEW.id,
+            'content', NEW.content,
+            'user_email', NEW.user_email,
+            'username', NEW.username,
+            'created_at', NEW.created_at
+        )
+    WHERE id = NEW.ticket_id;
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER update_ticket_response_summary
+    AFTER INSERT ON public.ticket_responses
+    FOR EACH ROW
+    EXECUTE FUNCTION ticket_responses_update_summary();
+
+-- Move existing responses out of the array column, oldest first
+INSERT INTO public.ticket_responses (ticket_id, content, user_email, username, created_at)
+SELECT t.id,
+       r.response->>'content',
+       coalesce(r.response->>'user_email', t.user_email),
+       r.response->>'username',
+       coalesce((r.response->>'created_at')::TIMESTAMP WITH TIME ZONE, t.created_at)
+FROM public.tickets t
+CROSS JOIN LATERAL unnest(t.responses) WITH ORDINALITY AS r(response, position)
+WHERE r.response->>'content' IS NOT NULL
+ORDER BY t.id, r.position;
+
+ALTER TABLE public.tickets DROP COLUMN IF EXISTS responses;
+
+ALTER TABLE public.ticket_responses ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view responses on their tickets"
+    ON public.ticket_responses FOR SELECT
+    USING (EXISTS (
+        SELECT 1 FROM public.tickets t
+        WHERE t.id = ticket_id
+        AND (t.user_email = auth.uid()::text OR
+             EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'))
+    ));
+
+-- There is no INSERT policy: responses are only added through the
+-- add_ticket_response function, which sets the author from the caller's
+-- profile, so clients can't post as someone else
@@ -0,0 +1,61 @@
+-- Row versions for optimistic concurrency on ticket updates
+ALTER TABLE public.tickets
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1,
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+UPDATE public.tickets SET updated_at = created_at WHERE updated_at IS NULL OR updated_at > created_at;
+
+-- The version only moves when editable fields change. Response summaries are
+-- appends and can't conflict, so they only touch updated_at.
+CREATE OR REPLACE FUNCTION tickets_bump_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    IF (NEW.title, NEW.description, NEW.status, NEW.assignee, NEW.related_uuids)
+        IS DISTINCT FROM (OLD.title, OLD.description, OLD.status, OLD.assignee, OLD.related_uuids) THEN
+        NEW.version = OLD.version + 1;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER bump_tickets_version
+    BEFORE UPDATE ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION tickets_bump_version();
+
+-- Append a response after checking the caller's access, and return the
+-- ticket with its refreshed response summary.
+CREATE OR REPLACE FUNCTION add_ticket_response(p_ticket_id INTEGER, p_content TEXT, p_username TEXT DEFAULT NULL)
+RETURNS SETOF public.tickets
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_role TEXT;
+    v_email TEXT;
+BEGIN
+    SELECT role, email INTO v_role, v_email FROM public.profiles WHERE id = auth.uid();
+
+    IF v_role IS NULL THEN
+        RAISE EXCEPTION 'User profile not found' USING ERRCODE = 'PT403';
+    END IF;
+
+    PERFORM 1 FROM public.tickets
+    WHERE id = p_ticket_id
+    AND (v_role = 'agent' OR user_email = v_email);
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Ticket not found or access denied' USING ERRCODE = 'PT404';
+    END IF;
+
+    INSERT INTO public.ticket_responses (ticket_id, content, user_email, username)
+    VALUES (p_ticket_id, p_content, v_email, coalesce(p_username, v_email));
+
+    RETURN QUERY SELECT * FROM public.tickets WHERE id = p_ticket_id;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION add_ticket_response(INTEGER, TEXT, TEXT) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION add_ticket_response(INTEGER, TEXT, TEXT) TO authenticated;
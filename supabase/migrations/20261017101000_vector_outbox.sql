@@ -0,0 +1,111 @@
+-- Durable outbox of tickets whose vectors need refreshing. Ticket writes only
+-- enqueue here; a background worker embeds and upserts in batches.
+-- One row per ticket, so repeated edits coalesce into a single re-index.
+CREATE TABLE IF NOT EXISTS public.vector_outbox (
+    ticket_id INTEGER PRIMARY KEY REFERENCES public.tickets(id) ON DELETE CASCADE,
+    enqueued_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp(),
+    available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Set while a worker is indexing the ticket. Kept apart from available_at
+    -- so a new edit can't hand the ticket to a second worker mid-index.
+    leased_until TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_vector_outbox_available_at ON public.vector_outbox(available_at);
+
+CREATE OR REPLACE FUNCTION enqueue_ticket_vector()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.vector_outbox (ticket_id)
+    VALUES (NEW.id)
+    ON CONFLICT (ticket_id) DO UPDATE
+    SET enqueued_at = clock_timestamp(),
+        available_at = CURRENT_TIMESTAMP,
+        attempts = 0,
+        last_error = NULL;
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER enqueue_ticket_vector_on_insert
+    AFTER INSERT ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION enqueue_ticket_vector();
+
+CREATE TRIGGER enqueue_ticket_vector_on_update
+    AFTER UPDATE OF title, description, status, assignee, related_uuids, response_count ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION enqueue_ticket_vector();
+
+-- Lease a batch of due entries. SKIP LOCKED lets every worker drain concurrently.
+CREATE OR REPLACE FUNCTION claim_vector_outbox(p_batch_size INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF public.vector_outbox
+LANGUAGE SQL
+AS $$
+    UPDATE public.vector_outbox o
+    SET leased_until = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds)
+    WHERE o.ticket_id IN (
+        SELECT ticket_id
+        FROM public.vector_outbox
+        WHERE available_at <= CURRENT_TIMESTAMP
+        AND (leased_until IS NULL OR leased_until <= CURRENT_TIMESTAMP)
+        ORDER BY enqueued_at
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o.*;
+$$;
+
+-- Remove processed entries. A ticket edited again while indexing stays
+-- queued, and its lease is released so the newer edit is indexed next.
+CREATE OR REPLACE FUNCTION complete_vector_outbox(p_entries JSONB)
+RETURNS VOID
+LANGUAGE SQL
+AS $$
+    WITH entries AS (
+        SELECT * FROM jsonb_to_recordset(p_entries) AS e(ticket_id INTEGER, enqueued_at TIMESTAMP WITH TIME ZONE)
+    ),
+    released AS (
+        UPDATE public.vector_outbox o
+        SET leased_until = NULL
+        FROM entries e
+        WHERE o.ticket_id = e.ticket_id
+        AND o.enqueued_at <> e.enqueued_at
+    )
+    DELETE FROM public.vector_outbox o
+    USING entries e
+    WHERE o.ticket_id = e.ticket_id
+    AND o.enqueued_at = e.enqueued_at;
+$$;
+
+-- Reschedule failed entries with exponential backoff
+CREATE OR REPLACE FUNCTION fail_vector_outbox(
+    p_ticket_ids INTEGER[],
+    p_error TEXT,
+    p_base_delay_seconds INTEGER,
+    p_max_delay_seconds INTEGER
+)
+RETURNS VOID
+LANGUAGE SQL
+AS $$
+    UPDATE public.vector_outbox
+    SET attempts = attempts + 1,
+        last_error = p_error,
+        leased_until = NULL,
+        available_at = CURRENT_TIMESTAMP + make_interval(
+            secs => least(p_max_delay_seconds, p_base_delay_seconds * power(2, attempts))
+        )
+    WHERE ticket_id = ANY(p_ticket_ids);
+$$;
+
+-- The outbox is only drained with the service role
+ALTER TABLE public.vector_outbox ENABLE ROW LEVEL SECURITY;
+
+REVOKE EXECUTE ON FUNCTION claim_vector_outbox(INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION complete_vector_outbox(JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION fail_vector_outbox(INTEGER[], TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
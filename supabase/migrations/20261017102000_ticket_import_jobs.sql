@@ -0,0 +1,109 @@
+-- Checkpoints for bulk ticket imports, so an interrupted upload can resume
+CREATE TABLE IF NOT EXISTS public.import_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    created_by UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    format TEXT NOT NULL CHECK (format IN ('ndjson', 'csv')),
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    rows_processed INTEGER NOT NULL DEFAULT 0,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    errors JSONB NOT NULL DEFAULT '[]'::jsonb,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_jobs_created_by ON public.import_jobs(created_by, created_at DESC);
+
+CREATE TRIGGER update_import_jobs_updated_at
+    BEFORE UPDATE ON public.import_jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+ALTER TABLE public.import_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Agents can manage their own import jobs"
+    ON public.import_jobs FOR ALL
+    USING (created_by = auth.uid() AND
+           EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'))
+    WITH CHECK (created_by = auth.uid() AND
+                EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'));
+
+-- Insert one batch of imported tickets and advance the job's checkpoint in the
+-- same transaction. Ticket UUIDs are deterministic per job row, so a batch that
+-- is replayed after a crash is skipped instead of duplicated.
+CREATE OR REPLACE FUNCTION import_ticket_batch(
+    p_job_id UUID,
+    p_offset INTEGER,
+    p_row_count INTEGER,
+    p_rows JSONB,
+    p_errors JSONB DEFAULT '[]'::jsonb
+)
+RETURNS SETOF public.import_jobs
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_job public.import_jobs;
+    v_inserted INTEGER;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent') THEN
+        RAISE EXCEPTION 'Only agents can import tickets' USING ERRCODE = 'PT403';
+    END IF;
+
+    SELECT * INTO v_job
+    FROM public.import_jobs
+    WHERE id = p_job_id AND created_by = auth.uid()
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Import job not found' USING ERRCODE = 'PT404';
+    END IF;
+
+    -- Another upload of the same job got here first
+    IF v_job.rows_processed <> p_offset THEN
+        RAISE EXCEPTION 'Import job is at row %, not %', v_job.rows_processed, p_offset
+            USING ERRCODE = 'PT409';
+    END IF;
+
+    INSERT INTO public.tickets (uuid, title, description, status, user_email, username, created_at, assignee)
+    SELECT
+        r.uuid,
+        r.title,
+        r.description,
+        COALESCE(r.status, 'open'),
+        r.user_email,
+        COALESCE(r.username, r.user_email),
+        COALESCE(r.created_at, CURRENT_TIMESTAMP),
+        COALESCE(r.assignee, ARRAY[]::TEXT[])
+    FROM jsonb_to_recordset(p_rows) AS r(
+        uuid UUID,
+        title TEXT,
+        description TEXT,
+        status TEXT,
+        user_email TEXT,
+        username TEXT,
+        created_at TIMESTAMP WITH TIME ZONE,
+        assignee TEXT[]
+    )
+    ON CONFLICT (uuid) DO NOTHING;
+
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    RETURN QUERY
+    UPDATE public.import_jobs
+    SET rows_processed = rows_processed + p_row_count,
+        inserted = inserted + v_inserted,
+        skipped = skipped + jsonb_array_length(p_rows) - v_inserted,
+        failed = failed + jsonb_array_length(p_errors),
+        -- Keep the first 100 row errors for the report
+        errors = CASE
+            WHEN jsonb_array_length(errors) >= 100 THEN errors
+            ELSE errors || p_errors
+        END
+    WHERE id = p_job_id
+    RETURNING *;
+END;
+$$;
@@ -0,0 +1,49 @@
+-- Responses of write requests sent with an Idempotency-Key header, so that
+-- retries replay the first response instead of repeating the write
+CREATE TABLE IF NOT EXISTS public.idempotency_keys (
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    status_code INTEGER,
+    content_type TEXT,
+    response_body TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- A request in progress holds the key until then; after that, a retry
+    -- may take it over, in case the worker running it died
+    locked_until TIMESTAMP WITH TIME ZONE,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP + INTERVAL '1 day',
+    PRIMARY KEY (user_id, endpoint, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON public.idempotency_keys(expires_at);
+
+ALTER TABLE public.idempotency_keys ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can manage their own idempotency keys"
+    ON public.idempotency_keys FOR ALL
+    USING (user_id = auth.uid())
+    WITH CHECK (user_id = auth.uid());
+
+-- Drop one batch of expired keys
+CREATE OR REPLACE FUNCTION prune_idempotency_keys(p_batch_size INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_deleted INTEGER;
+BEGIN
+    DELETE FROM public.idempotency_keys
+    WHERE ctid IN (
+        SELECT k.ctid FROM public.idempotency_keys k
+        WHERE k.expires_at < CURRENT_TIMESTAMP
+        LIMIT p_batch_size
+    );
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    RETURN v_deleted;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION prune_idempotency_keys(INTEGER) FROM PUBLIC, anon, authenticated;
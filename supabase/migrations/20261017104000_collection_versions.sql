@@ -0,0 +1,89 @@
+-- Change counters behind the list endpoints' ETags. Every write to a table
+-- bumps its scope's counter, so a conditional GET needs one primary key
+-- lookup instead of reading the collection. Deletes are counted too.
+CREATE TABLE IF NOT EXISTS public.collection_versions (
+    scope TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE public.collection_versions ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION bump_collection_version(p_scope TEXT)
+RETURNS VOID
+LANGUAGE SQL
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO public.collection_versions (scope, version)
+    VALUES (p_scope, 1)
+    ON CONFLICT (scope) DO UPDATE
+    SET version = collection_versions.version + 1,
+        updated_at = CURRENT_TIMESTAMP;
+$$;
+
+REVOKE EXECUTE ON FUNCTION bump_collection_version(TEXT) FROM PUBLIC, anon, authenticated;
+
+-- Statement level, so a bulk insert bumps the counter once
+CREATE OR REPLACE FUNCTION bump_table_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM bump_collection_version(TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER bump_tickets_collection_version
+    AFTER INSERT OR UPDATE OR DELETE ON public.tickets
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_table_version();
+
+CREATE TRIGGER bump_knowledge_files_collection_version
+    AFTER INSERT OR UPDATE OR DELETE ON public.knowledge_files
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_table_version();
+
+-- Widgets are per user, so each user gets their own scope
+CREATE OR REPLACE FUNCTION bump_widgets_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_collection_version('dashboard_widgets:' || OLD.user_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_collection_version('dashboard_widgets:' || NEW.user_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER bump_dashboard_widgets_collection_version
+    AFTER INSERT OR UPDATE OR DELETE ON public.dashboard_widgets
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_widgets_version();
+
+-- Counters reveal nothing but a change count, but callers only get their own widget scope
+CREATE OR REPLACE FUNCTION get_collection_version(p_scope TEXT)
+RETURNS BIGINT
+LANGUAGE SQL
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT coalesce((
+        SELECT version FROM public.collection_versions
+        WHERE scope = p_scope
+        AND (p_scope NOT LIKE 'dashboard_widgets:%' OR p_scope = 'dashboard_widgets:' || auth.uid())
+    ), 0);
+$$;
+
+REVOKE EXECUTE ON FUNCTION get_collection_version(TEXT) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION get_collection_version(TEXT) TO authenticated;
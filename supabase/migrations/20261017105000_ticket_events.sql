@@ -0,0 +1,188 @@
+-- Row-level change log behind the /tickets/stream feed. Ids are assigned
+-- when an event is inserted, not when it commits, so a long transaction can
+-- commit an event below ids that were already streamed. Events are therefore
+-- read in (txid, id) order, and only from transactions older than every one
+-- still running, which can't add events behind a client's position.
+CREATE TABLE IF NOT EXISTS public.ticket_events (
+    id BIGSERIAL PRIMARY KEY,
+    ticket_id INTEGER NOT NULL,
+    ticket_uuid UUID NOT NULL,
+    -- The ticket owner, used to scope the feed for customers
+    user_email TEXT NOT NULL,
+    event_type TEXT NOT NULL CHECK (event_type IN ('created', 'updated', 'status_changed', 'response_added', 'linked')),
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_events_user_email_id ON public.ticket_events(user_email, id);
+CREATE INDEX IF NOT EXISTS idx_ticket_events_txid_id ON public.ticket_events(txid, id);
+CREATE INDEX IF NOT EXISTS idx_ticket_events_created_at ON public.ticket_events(created_at);
+
+CREATE OR REPLACE FUNCTION ticket_event_summary(t public.tickets)
+RETURNS JSONB
+LANGUAGE SQL
+IMMUTABLE
+AS $$
+    SELECT jsonb_build_object(
+        'id', t.id,
+        'uuid', t.uuid,
+        'title', t.title,
+        'status', t.status,
+        'user_email', t.user_email,
+        'username', t.username,
+        'created_at', t.created_at,
+        'assignee', t.assignee,
+        'related_uuids', t.related_uuids,
+        'response_count', t.response_count,
+        'version', t.version
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION record_ticket_event()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_event_type TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_event_type := 'created';
+    ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+        v_event_type := 'status_changed';
+    ELSIF NEW.version IS DISTINCT FROM OLD.version THEN
+        v_event_type := 'updated';
+    ELSE
+        -- Response summaries are reported by the response itself
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO public.ticket_events (ticket_id, ticket_uuid, user_email, event_type, payload)
+    VALUES (NEW.id, NEW.uuid, NEW.user_email, v_event_type, ticket_event_summary(NEW));
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER record_ticket_event
+    AFTER INSERT OR UPDATE ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION record_ticket_event();
+
+CREATE OR REPLACE FUNCTION record_ticket_response_event()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.ticket_events (ticket_id, ticket_uuid, user_email, event_type, payload)
+    SELECT t.id, t.uuid, t.user_email, 'response_added', jsonb_build_object(
+        'ticket_id', t.id,
+        'response', to_jsonb(NEW)
+    )
+    FROM public.tickets t
+    WHERE t.id = NEW.ticket_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER record_ticket_response_event
+    AFTER INSERT ON public.ticket_responses
+    FOR EACH ROW
+    EXECUTE FUNCTION record_ticket_response_event();
+
+-- A link is reported on both tickets, so each owner sees it
+CREATE OR REPLACE FUNCTION record_ticket_link_event()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.ticket_events (ticket_id, ticket_uuid, user_email, event_type, payload)
+    SELECT t.id, t.uuid, t.user_email, 'linked', jsonb_build_object(
+        'ticket_id', t.id,
+        'related_uuid', CASE WHEN t.uuid = NEW.uuid_1 THEN NEW.uuid_2 ELSE NEW.uuid_1 END
+    )
+    FROM public.tickets t
+    WHERE t.uuid IN (NEW.uuid_1, NEW.uuid_2);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER record_ticket_link_event
+    AFTER INSERT ON public.ticket_relationships
+    FOR EACH ROW
+    EXECUTE FUNCTION record_ticket_link_event();
+
+ALTER TABLE public.ticket_events ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view events for their tickets"
+    ON public.ticket_events FOR SELECT
+    USING (user_email = (SELECT email FROM public.profiles WHERE id = auth.uid()) OR
+           EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'));
+
+-- Where a new subscriber starts: after every transaction that has finished
+CREATE OR REPLACE FUNCTION ticket_events_head()
+RETURNS TEXT
+LANGUAGE SQL
+STABLE
+AS $$
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT;
+$$;
+
+-- The next events after a stream position, from finished transactions only.
+-- Runs as the caller, so customers only see their own tickets' events.
+CREATE OR REPLACE FUNCTION ticket_events_since(p_txid TEXT, p_id BIGINT, p_limit INTEGER DEFAULT 100)
+RETURNS TABLE (
+    id BIGINT,
+    txid TEXT,
+    ticket_id INTEGER,
+    ticket_uuid UUID,
+    user_email TEXT,
+    event_type TEXT,
+    payload JSONB,
+    created_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE SQL
+STABLE
+AS $$
+    SELECT e.id, e.txid::TEXT, e.ticket_id, e.ticket_uuid, e.user_email, e.event_type, e.payload, e.created_at
+    FROM public.ticket_events e
+    WHERE (e.txid, e.id) > (p_txid::XID8, p_id)
+    AND e.txid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY e.txid, e.id
+    LIMIT p_limit;
+$$;
+
+REVOKE EXECUTE ON FUNCTION ticket_events_head() FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION ticket_events_head() TO authenticated;
+REVOKE EXECUTE ON FUNCTION ticket_events_since(TEXT, BIGINT, INTEGER) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION ticket_events_since(TEXT, BIGINT, INTEGER) TO authenticated;
+
+-- Retention: drop one batch of events older than p_older_than. Clients
+-- resuming from a pruned position continue with the oldest event kept.
+CREATE OR REPLACE FUNCTION prune_ticket_events(p_older_than INTERVAL, p_batch_size INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_deleted INTEGER;
+BEGIN
+    DELETE FROM public.ticket_events
+    WHERE id IN (
+        SELECT e.id FROM public.ticket_events e
+        WHERE e.created_at < CURRENT_TIMESTAMP - p_older_than
+        ORDER BY e.created_at
+        LIMIT p_batch_size
+    );
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    RETURN v_deleted;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION prune_ticket_events(INTERVAL, INTEGER) FROM PUBLIC, anon, authenticated;
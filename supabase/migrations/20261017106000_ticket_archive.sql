@@ -0,0 +1,173 @@
+-- Cold storage for tickets closed long ago. Archived tickets, their responses
+-- and their relationships move out of the hot tables, so everyday list,
+-- search and analytics queries only touch live tickets.
+
+-- When a ticket was last closed; cleared again if it's reopened
+ALTER TABLE public.tickets ADD COLUMN IF NOT EXISTS closed_at TIMESTAMP WITH TIME ZONE;
+
+-- When existing tickets were closed isn't recorded (updated_at was only just
+-- backfilled from created_at), so their retention period starts now
+UPDATE public.tickets
+SET closed_at = CURRENT_TIMESTAMP
+WHERE status = 'closed' AND closed_at IS NULL;
+
+CREATE OR REPLACE FUNCTION tickets_track_closed_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status <> 'closed' THEN
+        NEW.closed_at = NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        -- Imported tickets may already be closed
+        NEW.closed_at = coalesce(NEW.closed_at, NEW.created_at, CURRENT_TIMESTAMP);
+    ELSIF OLD.status IS DISTINCT FROM 'closed' THEN
+        NEW.closed_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER track_tickets_closed_at
+    BEFORE INSERT OR UPDATE OF status ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION tickets_track_closed_at();
+
+CREATE INDEX IF NOT EXISTS idx_tickets_closed_at ON public.tickets(closed_at) WHERE status = 'closed';
+
+-- Archive tables mirror the hot ones
+CREATE TABLE IF NOT EXISTS public.tickets_archive (
+    LIKE public.tickets INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    UNIQUE (uuid)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tickets_archive_created_at_id ON public.tickets_archive(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_archive_user_email ON public.tickets_archive(user_email, created_at, id);
+
+CREATE TABLE IF NOT EXISTS public.ticket_responses_archive (
+    LIKE public.ticket_responses INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    PRIMARY KEY (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_responses_archive_ticket_id_id
+    ON public.ticket_responses_archive(ticket_id, id);
+
+CREATE TABLE IF NOT EXISTS public.ticket_relationships_archive (
+    LIKE public.ticket_relationships INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    PRIMARY KEY (id),
+    UNIQUE (uuid_1, uuid_2)
+);
+
+-- Archived tickets whose vectors still need the archive vector policy applied.
+-- Rows are added with the archive and removed once the vectors are handled;
+-- a worker retries any still here after available_at.
+CREATE TABLE IF NOT EXISTS public.archive_vector_queue (
+    ticket_id INTEGER PRIMARY KEY,
+    available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP + INTERVAL '10 minutes',
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_archive_vector_queue_available_at ON public.archive_vector_queue(available_at);
+
+-- Only the archiver reads it, with the service role
+ALTER TABLE public.archive_vector_queue ENABLE ROW LEVEL SECURITY;
+
+-- Change feed clients are told when a ticket leaves the hot tables
+ALTER TABLE public.ticket_events DROP CONSTRAINT IF EXISTS ticket_events_event_type_check;
+ALTER TABLE public.ticket_events ADD CONSTRAINT ticket_events_event_type_check
+    CHECK (event_type IN ('created', 'updated', 'status_changed', 'response_added', 'linked', 'archived'));
+
+-- Move one batch of tickets closed for longer than p_older_than. Relationships
+-- move once both of their tickets are archived. Returns the archived tickets.
+CREATE OR REPLACE FUNCTION archive_closed_tickets(p_older_than INTERVAL, p_batch_size INTEGER)
+RETURNS TABLE (archived_id INTEGER, archived_uuid UUID)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_ids INTEGER[];
+    v_uuids UUID[];
+BEGIN
+    SELECT array_agg(t.id), array_agg(t.uuid) INTO v_ids, v_uuids
+    FROM (
+        SELECT tickets.id, tickets.uuid
+        FROM public.tickets
+        WHERE status = 'closed'
+        AND closed_at < CURRENT_TIMESTAMP - p_older_than
+        ORDER BY closed_at
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ) t;
+
+    IF v_ids IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO public.ticket_responses_archive
+    SELECT r.* FROM public.ticket_responses r WHERE r.ticket_id = ANY(v_ids);
+
+    INSERT INTO public.tickets_archive
+    SELECT t.*, CURRENT_TIMESTAMP FROM public.tickets t WHERE t.id = ANY(v_ids);
+
+    WITH moved AS (
+        DELETE FROM public.ticket_relationships r
+        WHERE (r.uuid_1 = ANY(v_uuids) OR r.uuid_2 = ANY(v_uuids))
+        AND EXISTS (SELECT 1 FROM public.tickets_archive a WHERE a.uuid = r.uuid_1)
+        AND EXISTS (SELECT 1 FROM public.tickets_archive a WHERE a.uuid = r.uuid_2)
+        RETURNING r.*
+    )
+    INSERT INTO public.ticket_relationships_archive SELECT * FROM moved;
+
+    INSERT INTO public.ticket_events (ticket_id, ticket_uuid, user_email, event_type, payload)
+    SELECT t.id, t.uuid, t.user_email, 'archived', ticket_event_summary(t)
+    FROM public.tickets t WHERE t.id = ANY(v_ids);
+
+    INSERT INTO public.archive_vector_queue (ticket_id)
+    SELECT unnest(v_ids)
+    ON CONFLICT (ticket_id) DO NOTHING;
+
+    -- Responses and pending vector updates go with the ticket
+    DELETE FROM public.tickets t WHERE t.id = ANY(v_ids);
+
+    RETURN QUERY SELECT unnest(v_ids), unnest(v_uuids);
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION archive_closed_tickets(INTERVAL, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- Hot and archived rows together, for reads that ask for archived tickets.
+-- security_invoker keeps the underlying tables' RLS in force.
+CREATE OR REPLACE VIEW public.tickets_with_archive
+WITH (security_invoker = true) AS
+SELECT t.*, NULL::TIMESTAMP WITH TIME ZONE AS archived_at FROM public.tickets t
+UNION ALL
+SELECT a.* FROM public.tickets_archive a;
+
+CREATE OR REPLACE VIEW public.ticket_responses_with_archive
+WITH (security_invoker = true) AS
+SELECT * FROM public.ticket_responses
+UNION ALL
+SELECT * FROM public.ticket_responses_archive;
+
+ALTER TABLE public.tickets_archive ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.ticket_responses_archive ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.ticket_relationships_archive ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own archived tickets"
+    ON public.tickets_archive FOR SELECT
+    USING (user_email = (SELECT email FROM public.profiles WHERE id = auth.uid()) OR
+           EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'));
+
+CREATE POLICY "Users can view archived responses on their tickets"
+    ON public.ticket_responses_archive FOR SELECT
+    USING (EXISTS (
+        SELECT 1 FROM public.tickets_archive t
+        WHERE t.id = ticket_id
+        AND (t.user_email = (SELECT email FROM public.profiles WHERE id = auth.uid()) OR
+             EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'))
+    ));
+
+CREATE POLICY "Agents can view archived ticket relationships"
+    ON public.ticket_relationships_archive FOR SELECT
+    USING (EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'));
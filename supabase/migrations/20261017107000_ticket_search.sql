@@ -0,0 +1,131 @@
+-- Full-text search over tickets and their responses. Documents live in their
+-- own table so they don't ride along in "select *" ticket payloads, and so
+-- reindexing a ticket doesn't fire the ticket update triggers.
+CREATE TABLE IF NOT EXISTS public.ticket_search (
+    ticket_id INTEGER PRIMARY KEY REFERENCES public.tickets(id) ON DELETE CASCADE,
+    document TSVECTOR NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_search_document ON public.ticket_search USING GIN (document);
+
+-- Titles rank above descriptions, which rank above responses
+CREATE OR REPLACE FUNCTION ticket_search_document(p_ticket_id INTEGER, p_title TEXT, p_description TEXT)
+RETURNS TSVECTOR
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_title, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(p_description, '')), 'B') ||
+           setweight(to_tsvector('english', coalesce((
+               SELECT string_agg(r.content, ' ' ORDER BY r.id)
+               FROM public.ticket_responses r
+               WHERE r.ticket_id = p_ticket_id
+           ), '')), 'C');
+$$;
+
+CREATE OR REPLACE FUNCTION tickets_index_search()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.ticket_search (ticket_id, document)
+    VALUES (NEW.id, ticket_search_document(NEW.id, NEW.title, NEW.description))
+    ON CONFLICT (ticket_id) DO UPDATE SET document = EXCLUDED.document;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER index_ticket_search_on_insert
+    AFTER INSERT ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION tickets_index_search();
+
+CREATE TRIGGER index_ticket_search_on_update
+    AFTER UPDATE OF title, description ON public.tickets
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title OR OLD.description IS DISTINCT FROM NEW.description)
+    EXECUTE FUNCTION tickets_index_search();
+
+-- Responses are append-only, so each one is appended to the document
+CREATE OR REPLACE FUNCTION ticket_responses_index_search()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    UPDATE public.ticket_search
+    SET document = document || setweight(to_tsvector('english', NEW.content), 'C')
+    WHERE ticket_id = NEW.ticket_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER index_ticket_response_search
+    AFTER INSERT ON public.ticket_responses
+    FOR EACH ROW
+    EXECUTE FUNCTION ticket_responses_index_search();
+
+INSERT INTO public.ticket_search (ticket_id, document)
+SELECT t.id, ticket_search_document(t.id, t.title, t.description)
+FROM public.tickets t
+ON CONFLICT (ticket_id) DO NOTHING;
+
+-- Only search_tickets reads the documents
+ALTER TABLE public.ticket_search ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.ticket_search FROM anon, authenticated;
+
+-- One page of tickets matching a web-style query ("quoted phrases", or, -not),
+-- best match first. Agents search every ticket, customers their own.
+-- Highlights are only computed for the returned page.
+CREATE OR REPLACE FUNCTION search_tickets(p_query TEXT, p_limit INTEGER DEFAULT 20, p_offset INTEGER DEFAULT 0)
+RETURNS TABLE (
+    id INTEGER,
+    uuid UUID,
+    title TEXT,
+    description TEXT,
+    status TEXT,
+    user_email TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    rank REAL,
+    title_highlight TEXT,
+    snippet TEXT
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('english', p_query) AS tsquery
+    ),
+    caller AS (
+        SELECT p.email, p.role = 'agent' AS is_agent
+        FROM public.profiles p
+        WHERE p.id = auth.uid()
+    ),
+    matches AS (
+        SELECT s.ticket_id, ts_rank_cd(s.document, query.tsquery) AS rank
+        FROM public.ticket_search s
+        JOIN public.tickets t ON t.id = s.ticket_id
+        CROSS JOIN query
+        CROSS JOIN caller
+        WHERE s.document @@ query.tsquery
+        AND (caller.is_agent OR t.user_email = caller.email)
+        ORDER BY rank DESC, s.ticket_id DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    SELECT t.id, t.uuid, t.title, t.description, t.status, t.user_email, t.created_at, m.rank,
+           ts_headline('english', t.title, query.tsquery, 'HighlightAll=true'),
+           ts_headline('english', t.description, query.tsquery, 'MaxFragments=2, MinWords=10, MaxWords=30')
+    FROM matches m
+    JOIN public.tickets t ON t.id = m.ticket_id
+    CROSS JOIN query
+    ORDER BY m.rank DESC, m.ticket_id DESC;
+$$;
+
+REVOKE EXECUTE ON FUNCTION search_tickets(TEXT, INTEGER, INTEGER) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION search_tickets(TEXT, INTEGER, INTEGER) TO authenticated;
@@ -0,0 +1,116 @@
+-- The API has always read and written knowledge_files.content; bring
+-- databases created from the initial schema in line with it
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = 'public' AND table_name = 'knowledge_files' AND column_name = 'file_content')
+       AND NOT EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_schema = 'public' AND table_name = 'knowledge_files' AND column_name = 'content') THEN
+        ALTER TABLE public.knowledge_files RENAME COLUMN file_content TO content;
+    END IF;
+END;
+$$;
+
+-- Full-text index over knowledge base passages. Text files are split into
+-- overlapping windows so a match can be shown in context and located in the
+-- file, and so ranking favours dense passages over long files.
+CREATE TABLE IF NOT EXISTS public.knowledge_chunks (
+    id BIGSERIAL PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES public.knowledge_files(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    document TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    UNIQUE (file_id, chunk_index)
+);
+
+CREATE INDEX IF NOT EXISTS idx_knowledge_chunks_document ON public.knowledge_chunks USING GIN (document);
+
+-- Rebuild a file's chunks. Windows are 1000 characters apart and 1200 long,
+-- so a phrase cut by one boundary is whole in the neighbouring chunk.
+CREATE OR REPLACE FUNCTION knowledge_files_index_chunks()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    DELETE FROM public.knowledge_chunks WHERE file_id = NEW.id;
+
+    -- Other file types are stored base64 encoded
+    IF NEW.file_type IN ('txt', 'md') AND coalesce(NEW.content, '') <> '' THEN
+        INSERT INTO public.knowledge_chunks (file_id, chunk_index, start_offset, content)
+        SELECT NEW.id, n, n * 1000, substr(NEW.content, n * 1000 + 1, 1200)
+        FROM generate_series(0, (length(NEW.content) - 1) / 1000) AS n;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER index_knowledge_file_chunks_on_insert
+    AFTER INSERT ON public.knowledge_files
+    FOR EACH ROW
+    EXECUTE FUNCTION knowledge_files_index_chunks();
+
+CREATE TRIGGER index_knowledge_file_chunks_on_update
+    AFTER UPDATE OF content, file_type ON public.knowledge_files
+    FOR EACH ROW
+    WHEN (OLD.content IS DISTINCT FROM NEW.content OR OLD.file_type IS DISTINCT FROM NEW.file_type)
+    EXECUTE FUNCTION knowledge_files_index_chunks();
+
+INSERT INTO public.knowledge_chunks (file_id, chunk_index, start_offset, content)
+SELECT f.id, n, n * 1000, substr(f.content, n * 1000 + 1, 1200)
+FROM public.knowledge_files f
+CROSS JOIN LATERAL generate_series(0, (length(f.content) - 1) / 1000) AS n
+WHERE f.file_type IN ('txt', 'md') AND coalesce(f.content, '') <> ''
+ON CONFLICT (file_id, chunk_index) DO NOTHING;
+
+ALTER TABLE public.knowledge_chunks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Agents can view knowledge chunks"
+    ON public.knowledge_chunks FOR SELECT
+    USING (EXISTS (SELECT 1 FROM public.profiles WHERE id = auth.uid() AND role = 'agent'));
+
+-- Files whose content matches a web-style query, best first, each with its
+-- best passage highlighted and that passage's character offset in the file
+CREATE OR REPLACE FUNCTION search_knowledge(p_query TEXT, p_limit INTEGER DEFAULT 20)
+RETURNS TABLE (
+    id INTEGER,
+    filename TEXT,
+    file_type TEXT,
+    file_size BIGINT,
+    uploaded_by TEXT,
+    uploaded_at TIMESTAMP WITH TIME ZONE,
+    rank REAL,
+    passage TEXT,
+    passage_offset INTEGER
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('english', p_query) AS tsquery
+    ),
+    best AS (
+        SELECT DISTINCT ON (c.file_id) c.file_id, c.content, c.start_offset,
+               ts_rank_cd(c.document, query.tsquery) AS rank
+        FROM public.knowledge_chunks c
+        CROSS JOIN query
+        WHERE c.document @@ query.tsquery
+        ORDER BY c.file_id, rank DESC, c.chunk_index
+    ),
+    ranked AS (
+        SELECT * FROM best ORDER BY rank DESC, file_id DESC LIMIT p_limit
+    )
+    SELECT f.id, f.filename, f.file_type, f.file_size, f.uploaded_by, f.uploaded_at, ranked.rank,
+           ts_headline('english', ranked.content, query.tsquery, 'MaxFragments=1, MinWords=15, MaxWords=40'),
+           ranked.start_offset
+    FROM ranked
+    JOIN public.knowledge_files f ON f.id = ranked.file_id
+    CROSS JOIN query
+    ORDER BY ranked.rank DESC, f.id DESC;
+$$;
+
+REVOKE EXECUTE ON FUNCTION search_knowledge(TEXT, INTEGER) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION search_knowledge(TEXT, INTEGER) TO authenticated;
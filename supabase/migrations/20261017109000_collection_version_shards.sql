@@ -0,0 +1,39 @@
+-- Spread each collection's change counter over several rows. With one row
+-- per scope, every statement on tickets queued on that row's lock, which
+-- serialized concurrent writers, imports and the archiver. Writers now bump
+-- the shard picked by their backend, and readers add the shards up. The sum
+-- only moves forward and only counts committed writes, like the single row.
+ALTER TABLE public.collection_versions ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE public.collection_versions DROP CONSTRAINT IF EXISTS collection_versions_pkey;
+ALTER TABLE public.collection_versions ADD PRIMARY KEY (scope, shard);
+
+CREATE OR REPLACE FUNCTION bump_collection_version(p_scope TEXT)
+RETURNS VOID
+LANGUAGE SQL
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO public.collection_versions (scope, shard, version)
+    VALUES (p_scope, pg_backend_pid() % 16, 1)
+    ON CONFLICT (scope, shard) DO UPDATE
+    SET version = collection_versions.version + 1,
+        updated_at = CURRENT_TIMESTAMP;
+$$;
+
+REVOKE EXECUTE ON FUNCTION bump_collection_version(TEXT) FROM PUBLIC, anon, authenticated;
+
+CREATE OR REPLACE FUNCTION get_collection_version(p_scope TEXT)
+RETURNS BIGINT
+LANGUAGE SQL
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT coalesce(sum(version), 0)::BIGINT
+    FROM public.collection_versions
+    WHERE scope = p_scope
+    AND (p_scope NOT LIKE 'dashboard_widgets:%' OR p_scope = 'dashboard_widgets:' || auth.uid());
+$$;
+
+REVOKE EXECUTE ON FUNCTION get_collection_version(TEXT) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION get_collection_version(TEXT) TO authenticated;
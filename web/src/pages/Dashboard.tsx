@@ -20,12 +20,7 @@ interface Ticket {
   user_email: string;
   username: string;
   assignee: string[];
-  responses: Array<{
-    content: string;
-    created_at: string;
-    user_email: string;
-    username: string;
-  }>;
+  response_count: number;
   related_uuids: string[];
 }
 
@@ -18,6 +18,14 @@ interface Agent {
   name: string;
 }
 
+interface TicketResponse {
+  id: number;
+  content: string;
+  created_at: string;
+  user_email: string;
+  username: string;
+}
+
 interface Ticket {
   id: number;
   title: string;
@@ -27,13 +35,10 @@ interface Ticket {
   username: string;
   user_email: string;
   assignee: string[];  // Array of agent UIDs
-  responses: Array<{
-    content: string;
-    created_at: string;
-    user_email: string;
-    username: string;
-  }>;
+  response_count: number;
+  latest_response: TicketResponse | null;
   related_uuids: string[];
+  version: number;
 }
 
 interface StatusOption {
@@ -53,6 +58,7 @@ const EditTicket: React.FC = () => {
   const { ticketId } = useParams();
   const [userRole, setUserRole] = useState<string>('');
   const [ticket, setTicket] = useState<Ticket | null>(null);
+  const [responses, setResponses] = useState<TicketResponse[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [formData, setFormData] = useState({
     description: '',
@@ -125,6 +131,18 @@ const EditTicket: React.FC = () => {
     };
 
     fetchTicket();
+
+    // Responses live in their own paginated endpoint
+    const fetchResponses = async () => {
+      try {
+        const data = await fetchWithAuth(`tickets/${ticketId}/responses?limit=200`);
+        setResponses(data);
+      } catch (error) {
+        console.error('Error fetching responses:', error);
+      }
+    };
+
+    fetchResponses();
   }, [ticketId]);
 
   const handleSubmit = async (e: React.FormEvent) => {
@@ -173,12 +191,16 @@ const EditTicket: React.FC = () => {
           'Content-Type': 'application/json',
           Authorization: `Bearer ${token}`,
           'X-Refresh-Token': refreshToken,
+          // Reject the update if someone else changed the ticket since it was loaded
+          'If-Match': `"${ticket?.version}"`,
         },
         body: JSON.stringify(updateData),
       });
 
       if (response.ok) {
         navigate('/dashboard');
+      } else if (response.status === 409) {
+        setError('This ticket was updated by someone else. Reload the page to see the latest changes.');
       } else {
         const errorData = await response.json();
         setError(errorData.error || 'Failed to update ticket');
@@ -189,7 +211,7 @@ const EditTicket: React.FC = () => {
     }
   };
 
-  const customTimelineMarker = (item: Ticket['responses'][0]) => {
+  const customTimelineMarker = (item: TicketResponse) => {
     return (
       <Avatar
         label={item.username.charAt(0).toUpperCase()}
@@ -272,9 +294,9 @@ const EditTicket: React.FC = () => {
               <span className="text-500">Responses</span>
             </Divider>
 
-            {ticket.responses.length > 0 && (
+            {responses.length > 0 && (
               <Timeline
-                value={ticket.responses}
+                value={responses}
                 content={(item) => (
                   <div className="flex flex-column">
                     <small className="text-500">{new Date(item.created_at).toLocaleString()}</small>